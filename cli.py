@@ -0,0 +1,166 @@
+# headless scans for cron / pipelines:
+#   python cli.py example.com > out.jsonl
+#   python cli.py -l domains.txt --methods crtsh,hackertarget,brute > out.jsonl
+#
+# with --jobs the brute-force, enrichment and probing go onto a job queue
+# (jobs.db) for any number of `python cli.py --worker` processes to run
+#
+# stdout is json lines: {"type": "result", ...row} as each host finishes (a
+# host another source finds later comes again with merged sources, last one
+# wins) and {"type": "summary", "domain", "stats", "diff"?} once a domain is
+# done. progress goes to stderr.
+#
+# exit codes: 0 found something, 1 finished but found nothing, 2 bad usage,
+# 3 a scan failed (or every source of one did), 130 interrupted
+
+import argparse
+import functools
+import json
+import sys
+import threading
+
+OK, EMPTY, FAILED = 0, 1, 3     # argparse already exits 2 on bad usage
+
+
+def _args(argv):
+    ap = argparse.ArgumentParser(prog="subscan", description="subdomain scan, json lines on stdout")
+    ap.add_argument("domains", nargs="*", help="domains to scan")
+    ap.add_argument("-l", "--list", help="file with one domain per line, - for stdin")
+    ap.add_argument("--methods", default="crtsh,hackertarget,alienvault", help="comma separated sources")
+    ap.add_argument("--concurrency", type=int, help="domains in flight at once when scanning a list")
+    ap.add_argument("--workers", type=int, help="shared enrichment / probe threads when scanning a list")
+    ap.add_argument("--no-enrich", action="store_true")
+    ap.add_argument("--no-probe", action="store_true")
+    ap.add_argument("--engine", choices=("async", "udp"))
+    ap.add_argument("--probe-engine", choices=("async", "threads"))
+    ap.add_argument("--resolvers", default="", help="comma separated ip[:port] list")
+    ap.add_argument("--ports", default="", help="comma separated ports to sweep before probing")
+    ap.add_argument("--wordlist", help="brute-force wordlist, plain / .gz / .zst (compiled to .wl on first use)")
+    ap.add_argument("--brute-budget", type=int, metavar="N", help="brute-force only the N most promising words")
+    ap.add_argument("--brute-time", type=float, metavar="SECONDS", help="stop brute-force after this long")
+    ap.add_argument("--permute-budget", type=int, metavar="N", help="max mutation candidates for the permute method")
+    ap.add_argument("--recurse-depth", type=int, metavar="N", help="max labels under the domain the recurse method digs into")
+    ap.add_argument("--recurse-budget", type=int, metavar="N", help="max queries for the recurse method")
+    ap.add_argument("--dns-profile", default="full", choices=("full", "web", "fast"))
+    ap.add_argument("--incremental", action="store_true", help="reuse fresh hosts from the last scan")
+    ap.add_argument("--jobs", nargs="?", const="", metavar="DB", help="hand work to workers via a job queue")
+    ap.add_argument("--worker", action="store_true", help="run jobs from the queue instead of scanning")
+    ap.add_argument("--idle-exit", type=float, metavar="SECONDS", help="worker quits after this long with no jobs")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no progress on stderr")
+    args = ap.parse_args(argv)
+    if args.worker:
+        return ap, args, []
+
+    domains = [d.strip().lower() for d in args.domains]
+    if args.list:
+        try:
+            src = sys.stdin if args.list == "-" else open(args.list, encoding="utf-8")
+            with src:
+                domains += [line.strip().lower() for line in src if line.strip() and not line.startswith("#")]
+        except (OSError, UnicodeDecodeError) as e:
+            ap.error(f"can't read {args.list}: {e}")
+    if not domains:
+        ap.error("no domains given")
+    return ap, args, list(dict.fromkeys(domains))
+
+
+def main(argv=None):
+    ap, args, domains = _args(argv)
+
+    # argument errors and --help shouldn't have to wait on requests / dnspython
+    import subscan
+
+    # engine errors exit FAILED, never EMPTY, so a pipeline can tell a broken
+    # scan from one that found nothing
+    jobs = None
+    try:
+        if args.worker or args.jobs is not None:
+            jobs = subscan.JobQueue(args.jobs or subscan.JOBS_DB)
+    except Exception as e:
+        print(f"can't open job queue: {e}", file=sys.stderr)
+        return FAILED
+    if args.worker:
+        try:
+            ran = subscan.work(jobs, args.idle_exit)
+        except KeyboardInterrupt:
+            return 130
+        except Exception as e:
+            print(f"worker failed: {e}", file=sys.stderr)
+            return FAILED
+        if not args.quiet:
+            print(f"worker done, ran {ran} jobs", file=sys.stderr)
+        return OK
+
+    bad = [d for d in domains if not subscan._valid_domain(d)]
+    if bad:
+        ap.error(f"invalid domain: {', '.join(bad)}")
+    methods = [m.strip() for m in args.methods.split(",") if m.strip()]
+    unknown = [m for m in methods if m not in subscan.SOURCES]
+    if unknown or not methods:
+        ap.error(f"unknown methods: {', '.join(unknown) or '(none)'} (pick from {', '.join(subscan.SOURCES)})")
+
+    out_lock = threading.Lock()
+
+    def _out(obj):
+        with out_lock:
+            sys.stdout.write(json.dumps(obj) + "\n")
+            sys.stdout.flush()
+
+    def _emit(domain, kind, item):
+        if kind == "result":
+            _out({"type": "result", **item})
+        elif not args.quiet:
+            with out_lock:
+                print(f"{domain} {item}", file=sys.stderr, flush=True)
+
+    kw = {
+        "enrich": not args.no_enrich,
+        "probe": not args.no_probe,
+        "engine": args.engine or subscan.DNS_ENGINE,
+        "probe_engine": args.probe_engine or subscan.PROBE_ENGINE,
+        "resolvers": [r.strip() for r in args.resolvers.split(",") if r.strip()] or None,
+        "ports": [int(p) for p in args.ports.split(",") if p.strip().isdigit()] or None,
+        "dns_profile": args.dns_profile,
+        "incremental": args.incremental,
+        "jobs": jobs,
+        "wordlist": args.wordlist,
+    }
+    for opt in ("brute_budget", "brute_time", "permute_budget", "recurse_depth", "recurse_budget"):
+        if getattr(args, opt) is not None:
+            kw[opt] = getattr(args, opt)
+
+    def _single(d):
+        try:
+            return subscan.run_scan(d, methods, emit=functools.partial(_emit, d), **kw)
+        except Exception as e:
+            return {"error": str(e), "results": [], "logs": []}
+
+    if len(domains) == 1:
+        scans = ((d, _single(d)) for d in domains)
+    else:
+        scans = subscan.run_batch(domains, methods, emit=_emit,
+                                  concurrency=args.concurrency or subscan.BATCH_DOMAINS,
+                                  workers=args.workers or subscan.MAX_W, **kw)
+
+    code = EMPTY
+    try:
+        for domain, data in scans:
+            summary = {"type": "summary", "domain": domain, "stats": data.get("stats", {})}
+            if "diff" in data:
+                summary["diff"] = data["diff"]
+            stats = data.get("stats", {})
+            if "error" in data:
+                summary["error"] = data["error"]
+                code = FAILED
+            elif stats.get("sources_used") and len(stats.get("sources_failed", ())) == stats["sources_used"]:
+                code = FAILED   # every source errored, that's not "found nothing"
+            elif stats.get("total") and code != FAILED:
+                code = OK
+            _out(summary)
+    except KeyboardInterrupt:
+        return 130
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3092 @@
+# scan engine: sources, dns, probing and run_scan / run_batch. no streamlit
+# in here, so it can be imported by the app, cli.py or anything else
+
+import requests
+import asyncio
+import dns.resolver
+import dns.asyncresolver
+import dns.message
+import dns.query
+import dns.flags
+import dns.rcode
+import dns.rdatatype
+import subprocess
+import array
+import bisect
+import codecs
+import functools
+import gzip
+import hashlib
+import io
+import itertools
+import mmap
+import struct
+import tempfile
+import multiprocessing
+import os
+import json
+import re
+import random
+import socket
+import selectors
+import pathlib
+import sqlite3
+import time
+import queue
+import threading
+import weakref
+import urllib3
+import http.cookiejar
+from requests.adapters import HTTPAdapter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from collections import Counter, deque
+from datetime import datetime
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+BASE = pathlib.Path(__file__).parent
+WORDLIST = BASE / "common_subdomains.txt"
+FINGERPRINTS = BASE / "fingerprints.json"
+DNS_TO = 4      # dns timeout
+HTTP_TO = 6     # http timeout
+MAX_W = 30      # max thread workers
+BATCH_DOMAINS = 16  # domains run_batch keeps in flight at once
+CPU_WORKERS = os.cpu_count() or 1   # processes for cpu-heavy post-processing, 1 = all in-process
+CPU_MIN = 100000    # fewer source names than this are cleaned in-process
+CPU_BATCH = 20000   # source names per cleaning task
+ANALYSE_BATCH = 64  # probe responses per title / tech detection task
+PIPE_QUEUE = 1000   # max items waiting between scan pipeline stages
+PROBE_ENGINE = "async"      # "async" (aiohttp) or "threads" (http_probe on MAX_W threads)
+PROBE_CONCURRENCY = 1000    # max probes in flight on the async engine
+PROBE_PER_HOST = 2          # max open connections per host
+PROBE_DEADLINE = 1800       # seconds the whole probe stage may run
+PROBE_BODY_MAX = 64 * 1024  # bytes of response body a probe will read
+PROBE_RACE = True           # try https and http at once instead of one after the other
+SCHEME_GRACE = 2.0          # once http answers, how much longer https gets to win
+PRECHECK_TO = 1.5           # tcp connect timeout for the threaded prober's :443 check
+WEB_PORTS = (80, 443, 8080, 8443)   # default ports for the optional pre-probe sweep
+PORTSCAN_TO = 1.5           # tcp connect timeout per port in the sweep
+BRUTE_INFLIGHT = 2000   # max concurrent brute-force queries
+BRUTE_BUDGET = 0        # max words brute-force tries, best first; 0 = the whole list
+BRUTE_TIME = 0          # seconds brute-force may run, 0 = no limit
+LEARN_TOP = 20000       # labels from past scans considered for moving up the wordlist
+LEARN_MIN = 2           # domains a label must have turned up on to be moved up
+LEARN_PRIOR = 5         # pseudo-tries the popularity prior is worth against a label's brute record
+RECURSE_DEPTH = 2       # max labels under the apex of a zone recursion brute-forces into
+RECURSE_WORDS = 1000    # words tried under each sub-zone (the top of the wordlist)
+RECURSE_QUERIES = 200000    # max queries the recursion may spend per scan, 0 = off
+PERMUTE_BUDGET = 50000  # max mutation candidates tried per scan, 0 = off
+PERMUTE_TOKENS = 50     # most common tokens of the found names reused as mutation words
+DNS_ENGINE = "async"    # "async" (dnspython) or "udp" (raw batch resolver)
+UDP_SOCKETS = 8         # sockets kept open by the udp batch resolver
+UDP_INFLIGHT = 5000     # max outstanding queries on the udp batch resolver
+UDP_RETRIES = 2
+RESOLVERS = []          # upstream resolvers ("ip" or "ip:port"), empty = system config
+RESOLVER_QPS = 1000     # per-upstream query cap, 0 = uncapped
+RESOLVER_COOLDOWN = 30  # seconds a sick upstream sits out before retrying
+DNS_RETRIES = 2         # extra tries, each on another upstream, after a timeout / SERVFAIL
+WILDCARD_PROBES = 3     # random labels resolved per zone when fingerprinting wildcards
+DNS_CACHE = BASE / "dns_cache.db"   # persistent answer cache, None to disable
+DNS_CACHE_ROWS = 500000 # evict soonest-expiring answers past this many rows
+DNS_NEG_TTL = 300       # how long NXDOMAIN / empty answers are cached
+DNS_CACHE_EVICT = 60    # max seconds between size checks, however few answers come in
+SCAN_STORE = BASE / "scans.db"  # last scan per domain, for incremental rescans; None to disable
+SCAN_TTL = 3 * 86400    # stored records / probe results older than this get redone
+JOBS_DB = BASE / "jobs.db"  # job queue shared by a coordinator and its workers
+JOB_CHUNK = 5000        # brute-force words per job
+JOB_BATCH = 256         # hosts per enrichment / probe job
+JOB_LEASE = 300         # seconds a worker has to finish a job before it's handed out again
+JOB_TRIES = 3           # hand-outs before a job is given up on
+JOB_POLL = 0.2          # seconds between queue polls when there's nothing to do
+JOB_WAIT = 3600         # max seconds a coordinator waits on its outstanding jobs
+JOB_KEEP = 86400        # finished jobs nobody collected are purged after this long
+
+# fallback wordlist if user hasn't added common_subdomains.txt yet
+_DEFAULT_WORDS = [
+    "www", "mail", "smtp", "pop", "imap", "webmail", "mx",
+    "ns1", "ns2", "api", "api-v1", "rest", "graphql", "gateway",
+    "cdn", "static", "assets", "media", "img",
+    "dev", "staging", "stage", "uat", "qa", "test", "sandbox",
+    "demo", "preview", "alpha", "beta", "prod", "production",
+    "admin", "dashboard", "panel", "console", "portal",
+    "app", "mobile", "m", "auth", "login", "sso", "oauth",
+    "shop", "store", "pay", "billing",
+    "blog", "news", "help", "support", "docs", "wiki",
+    "git", "gitlab", "jenkins", "ci", "grafana", "kibana",
+    "vpn", "remote", "bastion",
+    "db", "mysql", "postgres", "redis", "mongo", "backup",
+    "intranet", "internal", "corp", "status", "health", "monitor",
+    "autodiscover", "exchange", "ftp", "sftp",
+]
+
+
+def _ts():
+    return datetime.utcnow().strftime("%H:%M:%S")
+
+
+def _clean(raw, root):
+    s = raw.strip().lstrip("*.").lower()
+    if not s or "." not in s:
+        return None
+    if s == root or s.endswith("." + root):
+        return s
+    return None
+
+
+def _valid_domain(d):
+    return bool(re.match(r"^(?:[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}$", d))
+
+
+# --- resolver pool ---
+# spreads queries over several upstreams, each behind its own token bucket,
+# and benches any upstream whose error rate climbs until its cooldown expires
+
+def _parse_ns(ns):
+    if isinstance(ns, tuple):
+        return ns
+    ns = ns.strip()
+    if ns.startswith("["):
+        host, _, port = ns[1:].partition("]:")
+        return host.rstrip("]"), int(port or 53)
+    if ns.count(":") == 1:
+        host, port = ns.split(":")
+        return host, int(port)
+    return ns, 53
+
+
+class _Upstream:
+    def __init__(self, host, port, qps):
+        self.host, self.port, self.qps = host, port, qps
+        self.tokens = float(qps)
+        self.stamp = time.monotonic()
+        self.latency = 0.0      # ewma, ms
+        self.errors = 0.0       # ewma error rate
+        self.samples = 0
+        self.down_until = 0.0
+        self._sync = None
+        self._aio = None
+
+    def score(self):
+        return (self.latency or 1.0) * (1 + 4 * self.errors)
+
+    def resolver(self):
+        if self._sync is None:
+            r = dns.resolver.Resolver(configure=False)
+            r.nameservers, r.port, r.lifetime = [self.host], self.port, DNS_TO
+            r.retry_servfail = False
+            self._sync = r
+        return self._sync
+
+    def aresolver(self):
+        if self._aio is None:
+            r = dns.asyncresolver.Resolver(configure=False)
+            r.nameservers, r.port, r.lifetime = [self.host], self.port, DNS_TO
+            r.retry_servfail = False
+            self._aio = r
+        return self._aio
+
+
+class ResolverPool:
+    def __init__(self, upstreams=None, qps=RESOLVER_QPS, cooldown=RESOLVER_COOLDOWN):
+        if not upstreams:
+            try:
+                upstreams = dns.resolver.Resolver().nameservers
+            except Exception:
+                upstreams = ["1.1.1.1", "8.8.8.8"]
+        self.upstreams = [_Upstream(*_parse_ns(u), qps) for u in upstreams]
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def try_take(self, exclude=()):
+        """returns (upstream, 0) or (None, seconds to wait); upstreams in
+        exclude are only used if there's nobody else"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = []
+            for up in self.upstreams:
+                if up.down_until and up.down_until <= now:
+                    # back on probation with a clean slate
+                    up.down_until, up.errors, up.samples = 0.0, 0.0, 0
+                if up.down_until:
+                    continue
+                if up.qps:
+                    up.tokens = min(up.qps, up.tokens + (now - up.stamp) * up.qps)
+                    up.stamp = now
+                healthy.append(up)
+            if not healthy:
+                # everyone is benched, lean on whoever comes back first
+                up = min(self.upstreams, key=lambda u: u.down_until)
+                up.down_until = 0.0
+                healthy = [up]
+            others = [u for u in healthy if u not in exclude]
+            if others:
+                healthy = others
+            ready = [u for u in healthy if not u.qps or u.tokens >= 1]
+            if not ready:
+                return None, min((1 - u.tokens) / u.qps for u in healthy)
+            up = min(ready, key=_Upstream.score)
+            if up.qps:
+                up.tokens -= 1
+            return up, 0
+
+    def take(self, exclude=()):
+        while True:
+            up, wait = self.try_take(exclude)
+            if up:
+                return up
+            time.sleep(wait)
+
+    async def take_async(self, exclude=()):
+        while True:
+            up, wait = self.try_take(exclude)
+            if up:
+                return up
+            await asyncio.sleep(wait)
+
+    def report(self, up, ok, ms):
+        with self._lock:
+            up.samples += 1
+            up.latency = ms if up.samples == 1 else up.latency * 0.8 + ms * 0.2
+            up.errors = up.errors * 0.8 + (0.0 if ok else 0.2)
+            if up.samples >= 10 and up.errors > 0.5:
+                up.down_until = time.monotonic() + self.cooldown
+
+    def stats(self):
+        with self._lock:
+            return [{"resolver": f"{u.host}:{u.port}", "latency_ms": round(u.latency, 1),
+                     "error_rate": round(u.errors, 3), "down": bool(u.down_until)}
+                    for u in self.upstreams]
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ResolverPool(RESOLVERS)
+        return _POOL
+
+
+# --- dns answers + persistent cache ---
+# every lookup comes back as a plain record dict, which is what gets cached:
+#   {"values": [...], "cname": target or None, "ttl": seconds, "nx": bool}
+# values is empty for NXDOMAIN / NoAnswer; transport failures raise instead
+
+def _rdata_values(rtype, rrset):
+    if rtype in ("A", "AAAA"):
+        return [r.address for r in rrset]
+    if rtype == "CNAME":
+        return [str(r.target).rstrip(".") for r in rrset]
+    if rtype == "MX":
+        return [str(r.exchange).rstrip(".") for r in rrset]
+    if rtype == "NS":
+        return [str(r.target).rstrip(".") for r in rrset]
+    if rtype == "TXT":
+        return [b"".join(r.strings).decode(errors="ignore") for r in rrset]
+    return [r.to_text() for r in rrset]
+
+
+def _record(values, cname=None, ttl=None, nx=False):
+    return {"values": values, "cname": cname, "ttl": ttl, "nx": nx}
+
+
+def _answer_record(rtype, ans):
+    # cname is the name's own CNAME target (first hop), same as a CNAME lookup gives
+    cname = None
+    for rrset in ans.response.answer:
+        if rrset.rdtype == dns.rdatatype.CNAME and rrset.name == ans.qname:
+            cname = str(rrset[0].target).rstrip(".")
+    return _record(_rdata_values(rtype, ans), cname, ans.rrset.ttl if ans.rrset is not None else None)
+
+
+class DnsCache:
+    def __init__(self, path=DNS_CACHE, max_rows=DNS_CACHE_ROWS):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "name TEXT, rtype TEXT, expires REAL, data TEXT, PRIMARY KEY (name, rtype))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_expires ON answers (expires)")
+        # writes are held here and go out in one short transaction, so the
+        # file's write lock is never held between flushes — job workers in
+        # other processes share this cache
+        self._pending = {}      # (name, rtype) -> (expires, data)
+        self._last_flush = time.monotonic()
+        self._last_evict = 0.0
+        self.hits = self.misses = 0
+
+    def get(self, name, rtype):
+        key = (name.lower(), rtype)
+        with self._lock:
+            row = self._pending.get(key) or self._db.execute(
+                "SELECT expires, data FROM answers WHERE name = ? AND rtype = ?", key
+            ).fetchone()
+            if row and row[0] > time.time():
+                self.hits += 1
+                return json.loads(row[1])
+            self.misses += 1
+            return None
+
+    def put(self, name, rtype, rec):
+        ttl = DNS_NEG_TTL if not rec["values"] else rec["ttl"]
+        if not ttl:
+            return
+        with self._lock:
+            self._pending[(name.lower(), rtype)] = (time.time() + ttl, json.dumps(rec))
+            # batch commits, a cache can afford to lose the last second of writes
+            if len(self._pending) % 1000 == 0 or time.monotonic() - self._last_flush > 2:
+                self._flush()
+
+    def _flush(self):
+        n = len(self._pending)
+        try:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+                    (k + v for k, v in self._pending.items())
+                )
+                if n >= 1000 or time.monotonic() - self._last_evict > DNS_CACHE_EVICT:
+                    self._evict()
+        except sqlite3.Error:
+            # someone else has the file locked, try again next time round
+            # unless it's piling up
+            if n < 10000:
+                self._last_flush = time.monotonic()
+                return
+        self._pending.clear()
+        self._last_flush = time.monotonic()
+
+    def _evict(self):
+        self._last_evict = time.monotonic()
+        self._db.execute("DELETE FROM answers WHERE expires <= ?", (time.time(),))
+        over = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_rows
+        if over > 0:
+            self._db.execute(
+                "DELETE FROM answers WHERE rowid IN "
+                "(SELECT rowid FROM answers ORDER BY expires LIMIT ?)", (over,)
+            )
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+
+_CACHE = None
+
+
+def get_cache():
+    global _CACHE
+    if DNS_CACHE is None:
+        return None
+    with _POOL_LOCK:
+        if _CACHE is None:
+            try:
+                _CACHE = DnsCache(DNS_CACHE)
+            except sqlite3.Error:
+                return None
+        return _CACHE
+
+
+# NXDOMAIN / NoAnswer are real answers, only timeouts and SERVFAILs count
+# against an upstream's health
+def resolve(name, rtype, pool=None, cached=True):
+    cache = get_cache() if cached else None
+    rec = cache.get(name, rtype) if cache else None
+    if rec is not None:
+        return rec
+    pool = pool or get_pool()
+    tried = []
+    while True:
+        # a timeout / SERVFAIL is tried again on another upstream, benching
+        # only spares the queries that come after
+        up = pool.take(tried)
+        t0 = time.monotonic()
+        try:
+            rec = _answer_record(rtype, up.resolver().resolve(name, rtype, lifetime=DNS_TO))
+        except dns.resolver.NXDOMAIN:
+            rec = _record([], nx=True)
+        except dns.resolver.NoAnswer:
+            rec = _record([])
+        except Exception:
+            pool.report(up, False, (time.monotonic() - t0) * 1000)
+            tried.append(up)
+            if len(tried) > DNS_RETRIES:
+                raise
+            continue
+        break
+    pool.report(up, True, (time.monotonic() - t0) * 1000)
+    if cache:
+        cache.put(name, rtype, rec)
+    return rec
+
+
+async def resolve_async(name, rtype, pool=None, cached=True):
+    cache = get_cache() if cached else None
+    rec = cache.get(name, rtype) if cache else None
+    if rec is not None:
+        return rec
+    pool = pool or get_pool()
+    tried = []
+    while True:
+        up = await pool.take_async(tried)
+        t0 = time.monotonic()
+        try:
+            ans = await up.aresolver().resolve(name, rtype, lifetime=DNS_TO)
+            rec = _answer_record(rtype, ans)
+        except dns.resolver.NXDOMAIN:
+            rec = _record([], nx=True)
+        except dns.resolver.NoAnswer:
+            rec = _record([])
+        except Exception:
+            pool.report(up, False, (time.monotonic() - t0) * 1000)
+            tried.append(up)
+            if len(tried) > DNS_RETRIES:
+                raise
+            continue
+        break
+    pool.report(up, True, (time.monotonic() - t0) * 1000)
+    if cache:
+        cache.put(name, rtype, rec)
+    return rec
+
+
+# --- wildcard check ---
+# resolves a few random labels under a zone; whatever they answer with (ips,
+# cname target, ttl) is the zone's wildcard fingerprint, and brute hits are
+# checked against it straight from their first answer
+
+class Wildcard:
+    def __init__(self, zone):
+        self.zone = zone
+        self.ips = set()
+        self.cnames = set()
+        self.ttls = set()
+        # random names get NOERROR with no answer, so empty answers under this
+        # zone don't mean there's anything beneath them
+        self.nodata = False
+        self.answers = 0    # probes that got any answer at all, not kept in the cache
+
+    def __bool__(self):
+        return bool(self.ips or self.cnames)
+
+    def add_record(self, rec):
+        self.answers += 1
+        self.add(*_summary(rec))
+        self.nodata = self.nodata or _nodata(rec)
+
+    def add(self, ips, cname, ttl):
+        self.ips.update(ips)
+        if cname:
+            self.cnames.add(cname)
+        if ttl is not None:
+            self.ttls.add(ttl)
+
+    def to_record(self):
+        rec = _record(sorted(self.ips), ttl=min(self.ttls) if self.ttls else None)
+        rec.update(cnames=sorted(self.cnames), ttls=sorted(self.ttls), nodata=self.nodata)
+        return rec
+
+    @classmethod
+    def from_record(cls, zone, rec):
+        fp = cls(zone)
+        fp.ips, fp.cnames, fp.ttls = set(rec["values"]), set(rec["cnames"]), set(rec["ttls"])
+        fp.nodata = rec.get("nodata", False)
+        return fp
+
+    def matches(self, ips, cname=None, ttl=None):
+        if cname and cname in self.cnames:
+            return True
+        if ips and set(ips) <= self.ips:
+            # a real host may sit on the wildcard's ip, but a longer ttl than
+            # the wildcard ever served gives it away
+            return not self.ttls or ttl is None or ttl <= max(self.ttls)
+        return False
+
+
+def _probe_name(zone):
+    return f"_subscan{random.getrandbits(40):010x}.{zone}"
+
+
+def _summary(rec):
+    # (ips, cname target, ttl) of an A record, the shape Wildcard works on
+    return rec["values"], rec["cname"], rec["ttl"]
+
+
+def _nodata(rec):
+    # NOERROR with nothing in it: the name exists, as an empty non-terminal or
+    # with other types only. NXDOMAIN means nothing exists at or under it
+    return not rec["values"] and not rec["cname"] and not rec["nx"]
+
+
+def _parent_zone(fqdn):
+    return fqdn.split(".", 1)[1]
+
+
+# the probes themselves are random names and never worth caching, the
+# fingerprint they add up to is cached per zone instead
+
+def _cached_wildcard(domain):
+    cache = get_cache()
+    rec = cache.get(domain, "WILDCARD") if cache else None
+    return Wildcard.from_record(domain, rec) if rec is not None else None
+
+
+def _store_wildcard(fp):
+    # every probe timing out says nothing about the zone, caching that as
+    # "no wildcard" would let brute-force report wildcard names as real
+    cache = get_cache()
+    if cache and fp.answers:
+        cache.put(fp.zone, "WILDCARD", fp.to_record())
+    return fp
+
+
+def check_wildcard(domain, pool=None, probes=WILDCARD_PROBES):
+    fp = _cached_wildcard(domain)
+    if fp is not None:
+        return fp
+    fp = Wildcard(domain)
+    for _ in range(probes):
+        try:
+            fp.add_record(resolve(_probe_name(domain), "A", pool, cached=False))
+        except Exception:
+            pass
+    return _store_wildcard(fp)
+
+
+async def check_wildcard_async(domain, pool=None, probes=WILDCARD_PROBES):
+    fp = _cached_wildcard(domain)
+    if fp is not None:
+        return fp
+    fp = Wildcard(domain)
+
+    async def _one():
+        try:
+            fp.add_record(await resolve_async(_probe_name(domain), "A", pool, cached=False))
+        except Exception:
+            pass
+
+    await asyncio.gather(*(_one() for _ in range(probes)))
+    return _store_wildcard(fp)
+
+
+# --- shared http client ---
+# one keep-alive session for every source fetch and probe, so repeat requests
+# to a host skip dns/tcp/tls setup; cookies are refused so probes never carry
+# state from one host to the next
+
+class HttpClient:
+    def __init__(self, workers=MAX_W):
+        self.session = requests.Session()
+        self.session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        # pool_connections = hosts kept warm, pool_maxsize = sockets per host
+        adapter = HTTPAdapter(pool_connections=workers * 4, pool_maxsize=workers, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._adapter = adapter
+
+    def get(self, url, **kw):
+        return self.session.get(url, **kw)
+
+    def stats(self):
+        # urllib3 counts requests and sockets opened per host pool, the
+        # difference is requests served on a reused connection
+        pools = self._adapter.poolmanager.pools
+        reqs = conns = 0
+        for key in list(pools.keys()):
+            try:
+                p = pools[key]
+            except KeyError:
+                continue
+            reqs += p.num_requests
+            conns += p.num_connections
+        return {"requests": reqs, "connections": conns, "reused": max(reqs - conns, 0)}
+
+
+_HTTP = None
+
+
+def get_http():
+    global _HTTP
+    with _POOL_LOCK:
+        if _HTTP is None:
+            _HTTP = HttpClient()
+        return _HTTP
+
+
+# --- cpu pool ---
+# cleaning huge source dumps and fingerprinting probe responses are pure
+# python cpu work, so past a certain size they go to a process pool instead
+# of queueing behind the gil. tasks carry compact batches (one newline-joined
+# string of names, or a list of page heads), never one pickle per item.
+# building rows, scoring and json stay in-process: shipping row dicts across
+# costs more than making them
+
+_CPU = None
+
+
+def get_cpu_pool():
+    global _CPU
+    if CPU_WORKERS <= 1:
+        return None
+    with _POOL_LOCK:
+        if _CPU is None:
+            try:
+                # spawn, not fork: forking a process full of threads and
+                # open sqlite handles is asking for trouble
+                _CPU = ProcessPoolExecutor(CPU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, ValueError):
+                return None
+        return _CPU
+
+
+def _drop_cpu_pool(pool):
+    # a dead worker breaks the whole pool, the next caller gets a fresh one
+    global _CPU
+    with _POOL_LOCK:
+        if _CPU is pool:
+            _CPU = None
+    pool.shutdown(wait=False)
+
+
+def _clean_block(root, block):
+    return "\n".join(s for s in (_clean(n, root) for n in block.split("\n")) if s)
+
+
+def clean_names(raws, root):
+    # set of the names under root; duplicates go first (crt.sh repeats a
+    # name once per certificate), and a big remainder is cleaned across cores
+    raws = set(raws)
+    pool = get_cpu_pool() if len(raws) >= CPU_MIN else None
+    if pool is not None:
+        names = list(raws)
+        blocks = ["\n".join(names[i:i + CPU_BATCH]) for i in range(0, len(names), CPU_BATCH)]
+        try:
+            found = set()
+            for block in pool.map(functools.partial(_clean_block, root), blocks):
+                if block:
+                    found.update(block.split("\n"))
+            return found
+        except Exception:
+            _drop_cpu_pool(pool)
+    return {s for s in (_clean(n, root) for n in raws) if s}
+
+
+# --- streamed json ---
+# crt.sh can send hundreds of MB of json for a big domain, most of it the
+# same names once per certificate. the json sources are parsed as they come
+# off the socket, one array item at a time, and only the names are kept, so
+# memory follows the unique names rather than the size of the response
+
+JSON_CHUNK = 1 << 16    # bytes read off the socket at a time
+_JSON_WS = " \t\r\n"
+_JSON_NUM = set("0123456789.eE+-")
+
+
+class _JsonReader:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._dec = json.JSONDecoder()
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _more(self, want=0):
+        # reads past `want` more characters (at least one chunk), dropping
+        # what's already been parsed; False once the stream is done
+        if self.eof:
+            return False
+        self.buf, self.pos = self.buf[self.pos:], 0
+        got = 0
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            self.buf += text
+            got += len(text)
+            if got > want:
+                return True
+        self.buf += self._text.decode(b"", final=True)
+        self.eof = True
+        return got > 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _JSON_WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def take(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} in json stream")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self._dec.raw_decode(self.buf, self.pos)
+                # a number cut off by the end of the buffer (12 of 12.5) may go
+                # on in the next chunk, valid json always has something after it
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _JSON_NUM):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # doubling what's buffered keeps a big item from being re-parsed chunk by chunk
+            self._more(len(self.buf) - self.pos)
+
+    def items(self):
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            c = self.peek()
+            self.pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                raise ValueError("bad array in json stream")
+
+
+def json_items(chunks, *keys):
+    # yields (key, item) for every item of the arrays under the given keys of
+    # a top-level object, or (None, item) for a top-level array if no keys
+    rd = _JsonReader(chunks)
+    if not keys:
+        for item in rd.items():
+            yield None, item
+        return
+    rd.take("{")
+    left = set(keys)
+    while left and rd.peek() != "}":
+        key = rd.value()
+        rd.take(":")
+        if key in left and rd.peek() == "[":
+            left.discard(key)
+            for item in rd.items():
+                yield key, item
+        else:
+            rd.value()
+        if rd.peek() == ",":
+            rd.pos += 1
+
+
+class SourceError(Exception):
+    pass
+
+
+def _get_json(url, *keys, timeout=15, headers=None):
+    # (key, item) pairs streamed from url
+    hdrs = {"User-Agent": "Mozilla/5.0"}
+    hdrs.update(headers or {})
+    with get_http().get(url, timeout=timeout, headers=hdrs, stream=True) as r:
+        if r.status_code != 200:
+            raise SourceError(f"{url} answered {r.status_code}")
+        yield from json_items(r.iter_content(JSON_CHUNK), *keys)
+
+
+# --- enumeration sources ---
+# a source that can't answer raises (SourceError or whatever the transport
+# threw) rather than returning [], so a scan can tell "found nothing" from
+# "didn't run" and doesn't report every host it saw last time as gone
+
+def from_crtsh(domain):
+    items = _get_json(f"https://crt.sh/?q=%25.{domain}&output=json", timeout=20)
+    names = (n for _, e in items for n in e.get("name_value", "").split("\n"))
+    return sorted(clean_names(names, domain))
+
+
+def from_hackertarget(domain):
+    r = get_http().get(
+        f"https://api.hackertarget.com/hostsearch/?q={domain}",
+        timeout=15, headers={"User-Agent": "Mozilla/5.0"}
+    )
+    if r.status_code != 200 or "error" in r.text[:50].lower():
+        raise SourceError(f"hackertarget answered {r.status_code}: {r.text[:50].strip()}")
+    return sorted(clean_names((line.split(",")[0] for line in r.text.splitlines()), domain))
+
+
+def from_alienvault(domain):
+    items = _get_json(f"https://otx.alienvault.com/api/v1/indicators/domain/{domain}/passive_dns",
+                      "passive_dns")
+    names = (rec.get("hostname", "") for _, rec in items)
+    return sorted(clean_names(names, domain))
+
+
+def from_rapiddns(domain):
+    r = get_http().get(
+        f"https://rapiddns.io/subdomain/{domain}?full=1",
+        timeout=15, headers={"User-Agent": "Mozilla/5.0"}
+    )
+    if r.status_code != 200:
+        raise SourceError(f"rapiddns answered {r.status_code}")
+    pattern = r'<td>([a-zA-Z0-9.\-]+\.' + re.escape(domain) + r')</td>'
+    return sorted(clean_names(re.findall(pattern, r.text), domain))
+
+
+def from_bufferover(domain):
+    items = _get_json(f"https://dns.bufferover.run/dns?q=.{domain}", "FDNS_A", "RDNS", timeout=12)
+    names = (part for _, rec in items for part in rec.split(","))
+    return sorted(clean_names(names, domain))
+
+
+def from_virustotal(domain):
+    # no api key needed for this endpoint, limited results but still useful
+    items = _get_json(f"https://www.virustotal.com/ui/domains/{domain}/subdomains?limit=40", "data",
+                      headers={"Accept": "application/json"})
+    found = set()
+    for _, item in items:
+        s = _clean(item.get("id", ""), domain)
+        if s:
+            found.add(s)
+    return sorted(found)
+
+
+def from_sublister(domain):
+    script = BASE / "Sublist3r" / "sublist3r.py"
+    if not script.exists():
+        raise SourceError(f"{script} not found")
+    outfile = BASE / f"_tmp_{domain}.txt"
+    try:
+        subprocess.run(
+            ["python", str(script), "-d", domain, "-o", str(outfile), "-t", "10"],
+            capture_output=True, text=True, timeout=120
+        )
+        if not outfile.exists():
+            raise SourceError("sublist3r wrote no output")
+        lines = outfile.read_text().splitlines()
+        return [s for s in (_clean(l.strip(), domain) for l in lines if l.strip()) if s]
+    finally:
+        if outfile.exists():
+            outfile.unlink(missing_ok=True)
+
+
+# --- wordlists ---
+# a wordlist is compiled once into <name>.wl next to it (or in the temp dir if
+# that's read-only): lowercased, validated, deduped labels joined by \n after
+# a small header that remembers the source's size and mtime, and followed by
+# a sorted array of 64-bit word hashes for membership checks. the .wl file is
+# mmapped read-only and one Wordlist per file is shared by every scan in the
+# process — other processes mapping the same file share its pages too — so
+# a ten-million-word list costs the same to start a scan with as a tiny one
+
+_WL_MAGIC = b"SUBSCNW2"
+_WL_HEAD = struct.Struct("<8sQQQQ")    # magic, count, source size, source mtime_ns, hash index offset
+_WL_BLOCK = 1 << 18                     # bytes decoded per step when iterating
+_WORD_RX = re.compile(rb"^(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?\.)*[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?$")
+
+
+def _word_hash(w):
+    return int.from_bytes(hashlib.blake2b(w, digest_size=8).digest(), "little")
+
+
+class Wordlist:
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self.src_size, self.src_mtime, self._index = _WL_HEAD.unpack_from(self._mm)
+        if magic != _WL_MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled wordlist (or an older format)")
+        self._hashes = memoryview(self._mm)[self._index:self._index + 8 * self._count].cast("Q")
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, word):
+        # binary search of the hash index, no need to walk the words
+        h = _word_hash(word.encode("ascii", "replace"))
+        i = bisect.bisect_left(self._hashes, h)
+        return i < self._count and self._hashes[i] == h
+
+    def __iter__(self):
+        # no shared position, so any number of scans can walk it at once
+        mm, pos, end = self._mm, _WL_HEAD.size, self._index
+        while pos < end:
+            block = mm[pos:min(pos + _WL_BLOCK, end)]
+            cut = block.rfind(b"\n") + 1
+            if not cut:
+                break   # only the index padding is left
+            for w in block[:cut].split(b"\n")[:-1]:
+                yield w.decode("ascii")
+            pos += cut
+
+
+def _open_words(src):
+    # binary line iterator over a plain, .gz or .zst wordlist
+    if src.suffix == ".gz":
+        return gzip.open(src, "rb")
+    if src.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(f"{src.name}: reading .zst wordlists needs the zstandard package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(src, "rb"), closefd=True))
+    return open(src, "rb")
+
+
+def compile_wordlist(src, dst):
+    src, dst = pathlib.Path(src), pathlib.Path(dst)
+    st = src.stat()
+    seen = set()
+    n = 0
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    try:
+        with _open_words(src) as f, open(tmp, "wb") as out:
+            out.write(_WL_HEAD.pack(_WL_MAGIC, 0, st.st_size, st.st_mtime_ns, 0))
+            buf = []
+            for line in f:
+                w = line.strip().lower()
+                if not w or len(w) > 200 or w in seen or not _WORD_RX.match(w):
+                    continue
+                seen.add(w)
+                buf.append(w)
+                if len(buf) >= 65536:
+                    out.write(b"\n".join(buf) + b"\n")
+                    n += len(buf)
+                    buf.clear()
+            if buf:
+                out.write(b"\n".join(buf) + b"\n")
+                n += len(buf)
+            index = -(-out.tell() // 8) * 8
+            out.write(b"\0" * (index - out.tell()))
+            hashes = array.array("Q", sorted(_word_hash(w) for w in seen))
+            del seen
+            hashes.tofile(out)
+            out.seek(0)
+            out.write(_WL_HEAD.pack(_WL_MAGIC, n, st.st_size, st.st_mtime_ns, index))
+        # several processes may compile at once, the last rename wins and
+        # they all wrote the same thing
+        os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return dst
+
+
+def _compiled_paths(src):
+    key = hashlib.blake2b(str(src).encode(), digest_size=8).hexdigest()
+    return [src.with_name(src.name + ".wl"), pathlib.Path(tempfile.gettempdir()) / f"subscan-{key}.wl"]
+
+
+_WORDLISTS = {}     # source path -> Wordlist
+_WL_LOCK = threading.Lock()
+
+
+def load_wordlist(path=WORDLIST):
+    src = pathlib.Path(path).resolve()
+    if src.suffix == ".wl":
+        with _WL_LOCK:
+            if src not in _WORDLISTS:
+                _WORDLISTS[src] = Wordlist(src)
+            return _WORDLISTS[src]
+    st = src.stat()
+    stamp = (st.st_size, st.st_mtime_ns)
+    with _WL_LOCK:
+        wl = _WORDLISTS.get(src)
+        if wl is not None and (wl.src_size, wl.src_mtime) == stamp:
+            return wl
+        for dst in _compiled_paths(src):
+            try:
+                if dst.exists():
+                    try:
+                        wl = Wordlist(dst)
+                    except ValueError:
+                        wl = None   # an older format, compiled again below
+                    if wl is not None and (wl.src_size, wl.src_mtime) == stamp:
+                        break
+                wl = Wordlist(compile_wordlist(src, dst))
+                break
+            except (OSError, ValueError) as e:
+                wl, err = None, e
+        if wl is None:
+            raise OSError(f"couldn't compile {src}: {err}")
+        _WORDLISTS[src] = wl
+        return wl
+
+
+def _load_words(path=None):
+    # _DEFAULT_WORDS if WORDLIST is missing or unreadable; a list the user
+    # named raises instead, so they hear about it rather than get 79 words
+    if path is not None:
+        return load_wordlist(path)
+    try:
+        return load_wordlist(WORDLIST)
+    except (OSError, RuntimeError, ValueError):
+        return _DEFAULT_WORDS
+
+
+# a few hundred labels give most hits, so the list is walked best first:
+# learned labels by expected yield (see ScanStore.label_scores), then the
+# rest in file order. with a query or time budget that gets most of the
+# findings for a fraction of the queries. every brute-force run records
+# which learned labels it got to and which labels hit, so the ranking
+# follows what actually answers
+
+class RankedWords:
+    def __init__(self, words, top=(), limit=0):
+        self.words = words
+        self.top = list(top)
+        self._top = set(self.top)
+        self.limit = limit
+        self._taken = 0     # top labels handed out by the last walk
+
+    def __len__(self):
+        return min(self.limit, len(self.words)) if self.limit else len(self.words)
+
+    def __iter__(self):
+        self._taken = 0
+
+        def _top():
+            for w in self.top:
+                self._taken += 1
+                yield w
+
+        rest = (w for w in self.words if w not in self._top)
+        return itertools.islice(itertools.chain(_top(), rest), len(self))
+
+    def tried(self):
+        # the learned labels the last walk got to; the rest of the list isn't
+        # tracked, a label from it that hits is learned from then on
+        return self.top[:self._taken]
+
+
+def rank_words(words, limit=0):
+    # learned labels only move up if they're in the list, never get added
+    store = get_store()
+    try:
+        learned = [lb for lb, _ in store.label_scores(LEARN_TOP)] if store else []
+    except sqlite3.Error:
+        learned = []
+    # a compiled list answers from its hash index; the built-in fallback is tiny
+    has = words.__contains__ if isinstance(words, Wordlist) else set(words).__contains__
+    return RankedWords(words, [lb for lb in learned if has(lb)], limit)
+
+
+def _until(items, deadline):
+    # stops handing out items once time.time() passes deadline
+    for item in items:
+        if deadline is not None and time.time() >= deadline:
+            return
+        yield item
+
+
+# --- raw udp batch resolver ---
+# keeps a few non-blocking udp sockets open and multiplexes thousands of
+# queries over them, matching answers back by (socket, transaction id)
+
+def _msg_record(msg, rtype):
+    if msg is None:
+        return None
+    if msg.rcode() == dns.rcode.NXDOMAIN:
+        return _record([], nx=True)
+    if msg.rcode() != dns.rcode.NOERROR:
+        return None
+    want = dns.rdatatype.from_text(rtype)
+    values, cname, ttl = [], None, None
+    for rrset in msg.answer:
+        if rrset.rdtype == want:
+            values.extend(_rdata_values(rtype, rrset))
+            ttl = rrset.ttl if ttl is None else min(ttl, rrset.ttl)
+        elif rrset.rdtype == dns.rdatatype.CNAME and rrset.name == msg.question[0].name:
+            cname = str(rrset[0].target).rstrip(".")
+    return _record(values, cname, ttl)
+
+
+class UdpBatchResolver:
+    def __init__(self, pool=None, sockets=UDP_SOCKETS, inflight=UDP_INFLIGHT,
+                 timeout=DNS_TO, retries=UDP_RETRIES):
+        self.pool = pool or get_pool()
+        self.sockets = sockets
+        self.inflight = inflight
+        self.timeout = timeout
+        self.retries = retries
+
+    def _open(self):
+        socks = {}
+        for fam in {socket.AF_INET6 if ":" in u.host else socket.AF_INET for u in self.pool.upstreams}:
+            socks[fam] = []
+            for _ in range(self.sockets):
+                sk = socket.socket(fam, socket.SOCK_DGRAM)
+                sk.setblocking(False)
+                try:
+                    sk.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+                except OSError:
+                    pass
+                socks[fam].append(sk)
+        return socks
+
+    def resolve_many(self, queries):
+        """yields (name, rtype, record) as answers arrive; record is None on failure"""
+        queries = iter(queries)
+        cache = get_cache()
+        socks = self._open()
+        sel = selectors.DefaultSelector()
+        for group in socks.values():
+            for sk in group:
+                sel.register(sk, selectors.EVENT_READ)
+        pending = {}    # (socket, id) -> [name, rtype, query, upstream, deadline, tries]
+        retry = []
+        exhausted = False
+        rr = 0
+        next_sweep = time.monotonic()
+        pool = self.pool
+
+        def _send(entry):
+            nonlocal rr
+            up, _ = pool.try_take()
+            if not up:
+                retry.append(entry)
+                return False    # every upstream is at its rate cap
+            fam = socket.AF_INET6 if ":" in up.host else socket.AF_INET
+            sk = socks[fam][rr % len(socks[fam])]
+            rr += 1
+            qid = random.randint(0, 0xFFFF)
+            while (sk, qid) in pending:
+                qid = random.randint(0, 0xFFFF)
+            entry[2].id = qid
+            try:
+                sk.sendto(entry[2].to_wire(), (up.host, up.port))
+            except (BlockingIOError, InterruptedError):
+                retry.append(entry)
+                return False
+            entry[3], entry[4] = up, time.monotonic() + self.timeout
+            pending[(sk, qid)] = entry
+            return True
+
+        try:
+            while True:
+                # top up the in-flight window, retries first; stop early if
+                # the send buffer is full and drain some answers instead
+                while len(pending) < self.inflight:
+                    if retry:
+                        entry = retry.pop()
+                    elif not exhausted:
+                        try:
+                            name, rtype = next(queries)
+                        except StopIteration:
+                            exhausted = True
+                            continue
+                        rec = cache.get(name, rtype) if cache else None
+                        if rec is not None:
+                            yield name, rtype, rec
+                            continue
+                        entry = [name, rtype, dns.message.make_query(name, rtype), None, 0, 0]
+                    else:
+                        break
+                    if not _send(entry):
+                        break
+
+                if exhausted and not pending and not retry:
+                    break
+
+                for key, _ in sel.select(timeout=0.05):
+                    sk = key.fileobj
+                    while True:
+                        try:
+                            data, addr = sk.recvfrom(65535)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except OSError:
+                            break
+                        try:
+                            resp = dns.message.from_wire(data)
+                        except Exception:
+                            continue
+                        entry = pending.get((sk, resp.id))
+                        if not entry or not entry[2].is_response(resp):
+                            continue
+                        del pending[(sk, resp.id)]
+                        name, rtype, q, up = entry[:4]
+                        sent = entry[4] - self.timeout
+                        pool.report(up, resp.rcode() in (dns.rcode.NOERROR, dns.rcode.NXDOMAIN),
+                                    (time.monotonic() - sent) * 1000)
+                        if resp.flags & dns.flags.TC:
+                            try:
+                                resp = dns.query.tcp(q, up.host, timeout=self.timeout, port=up.port)
+                            except Exception:
+                                resp = None
+                        rec = _msg_record(resp, rtype)
+                        if cache and rec is not None:
+                            cache.put(name, rtype, rec)
+                        yield name, rtype, rec
+
+                now = time.monotonic()
+                if now >= next_sweep:
+                    next_sweep = now + 0.1
+                    for k in [k for k, e in pending.items() if e[4] <= now]:
+                        entry = pending.pop(k)
+                        pool.report(entry[3], False, self.timeout * 1000)
+                        if entry[5] < self.retries:
+                            entry[5] += 1
+                            retry.append(entry)
+                        else:
+                            yield entry[0], entry[1], None
+        finally:
+            sel.close()
+            for group in socks.values():
+                for sk in group:
+                    sk.close()
+
+
+# --- async brute-force engine ---
+# a fixed set of worker coroutines pull names from one shared iterator, so
+# memory stays flat no matter how long the wordlist is and the number of
+# queries in flight is capped by `inflight` rather than by thread count
+
+# both engines can hand back what they learned: known[fqdn] gets the A and
+# CNAME answers of every hit, in get_dns_records' shape, so enrichment can
+# skip those lookups, and ents gets every name that answered NOERROR-empty
+# (something lives under it) for the recursion to dig into
+
+async def _brute_async(domain, words, wildcard=None, inflight=BRUTE_INFLIGHT, pool=None, known=None,
+                       ents=None, deadline=None):
+    pool = pool or get_pool()
+    names = _until(words, deadline)
+    found = []
+    # zone -> fingerprint task, deeper zones are fingerprinted on first hit
+    zones = {}
+    if wildcard is not None:
+        zones[domain] = asyncio.get_running_loop().create_future()
+        zones[domain].set_result(wildcard)
+
+    def _zone_fp(zone):
+        if zone not in zones:
+            zones[zone] = asyncio.ensure_future(check_wildcard_async(zone, pool))
+        return zones[zone]
+
+    async def _worker():
+        for w in names:
+            fqdn = f"{w}.{domain}"
+            try:
+                rec = await resolve_async(fqdn, "A", pool)
+            except Exception:
+                continue
+            if not rec["values"]:
+                if ents is not None and _nodata(rec) and not (await _zone_fp(_parent_zone(fqdn))).nodata:
+                    ents.add(fqdn)
+                continue
+            fp = await _zone_fp(_parent_zone(fqdn))
+            if fp and fp.matches(*_summary(rec)):
+                continue
+            found.append(fqdn)
+            if known is not None:
+                known[fqdn] = {"A": rec["values"], "CNAME": rec["cname"]}
+
+    n = max(1, min(inflight, len(words)))
+    await asyncio.gather(*(_worker() for _ in range(n)))
+    return sorted(found)
+
+
+def _brute_udp(domain, words, wildcard=None, inflight=UDP_INFLIGHT, pool=None, known=None, ents=None,
+               deadline=None):
+    hits, empty = [], []
+    batch = UdpBatchResolver(pool, inflight=inflight)
+    for fqdn, _, rec in batch.resolve_many((f"{w}.{domain}", "A") for w in _until(words, deadline)):
+        if rec and rec["values"]:
+            hits.append((fqdn, _summary(rec)))
+        elif rec and ents is not None and _nodata(rec):
+            empty.append(fqdn)
+
+    zones = {domain: wildcard if wildcard is not None else check_wildcard(domain, pool)}
+
+    def _zone_fp(fqdn):
+        zone = _parent_zone(fqdn)
+        if zone not in zones:
+            zones[zone] = check_wildcard(zone, pool)
+        return zones[zone]
+
+    for fqdn in empty:
+        if not _zone_fp(fqdn).nodata:
+            ents.add(fqdn)
+    found = []
+    for fqdn, summary in hits:
+        fp = _zone_fp(fqdn)
+        if fp and fp.matches(*summary):
+            continue
+        found.append(fqdn)
+        if known is not None:
+            known[fqdn] = {"A": summary[0], "CNAME": summary[1]}
+    return sorted(found)
+
+
+def from_bruteforce(domain, wildcard=None, inflight=BRUTE_INFLIGHT, engine=DNS_ENGINE, pool=None,
+                    known=None, words=None, ents=None, deadline=None):
+    words = _load_words() if words is None else words
+    if not words:
+        return []
+    if engine == "udp":
+        return _brute_udp(domain, words, wildcard, pool=pool, known=known, ents=ents, deadline=deadline)
+    # runs inside run_scan's source pool, so each call gets its own loop
+    return asyncio.run(_brute_async(domain, words, wildcard, inflight, pool, known, ents, deadline))
+
+
+# --- permutations ---
+# altdns-style candidates built from what the other sources found:
+# dev-api.example.com suggests staging-api, dev-api2, api-dev, qa.dev-api ...
+# they go through the brute-force path, so wildcard zones are filtered the
+# same way. kinds that hit most often come first, so a small budget still
+# gets the likely ones
+
+_PERMUTE_WORDS = (
+    "dev", "development", "stage", "staging", "stg", "test", "testing", "qa", "uat", "prod",
+    "preprod", "demo", "beta", "alpha", "int", "internal", "ext", "admin", "api", "app",
+    "old", "new", "v1", "v2", "backup", "sandbox", "corp", "mobile", "m", "www", "cdn",
+    "static", "vpn", "mail", "portal", "web", "us", "eu", "east", "west",
+)
+_NUM_RX = re.compile(r"\d+")
+
+
+def _numbered(rel):
+    # api2 -> api1 / api3, api -> api1 / api2
+    first, dot, rest = rel.partition(".")
+    runs = list(_NUM_RX.finditer(first))
+    if not runs:
+        yield f"{first}1{dot}{rest}"
+        yield f"{first}2{dot}{rest}"
+    for m in runs:
+        n = int(m.group())
+        for k in (n - 1, n + 1):
+            if k >= 0:
+                yield f"{first[:m.start()]}{k:0{len(m.group())}d}{first[m.end():]}{dot}{rest}"
+
+
+def _flipped(rel):
+    # dev-api -> api-dev
+    first, dot, rest = rel.partition(".")
+    parts = first.split("-")
+    if len(parts) > 1:
+        yield "-".join(reversed(parts)) + dot + rest
+
+
+def _swapped(rel, w):
+    # dev-api -> staging-api / dev-staging, dev.api -> staging.api
+    first, dot, rest = rel.partition(".")
+    parts = first.split("-")
+    if w in parts or (len(parts) == 1 and not rest):
+        return      # api-api, or just brute-force
+    for i in range(len(parts)):
+        yield "-".join(parts[:i] + [w] + parts[i + 1:]) + dot + rest
+
+
+def _dashed(rel, w):
+    first, dot, rest = rel.partition(".")
+    if w in first.split("-"):
+        return
+    yield f"{w}-{first}{dot}{rest}"
+    yield f"{first}-{w}{dot}{rest}"
+
+
+def _dotted(rel, w):
+    yield f"{w}.{rel}"
+
+
+def permutations(names, domain, budget=PERMUTE_BUDGET):
+    # returns up to budget labels (relative to domain, like wordlist entries)
+    # that aren't among names
+    if budget <= 0:
+        return []
+    known = set(names)
+    cut = len(domain) + 1
+    rels = sorted(n[:-cut] for n in known if n.endswith("." + domain))
+    # the target's own naming beats the generic list
+    counts = Counter(t for r in rels for t in re.split(r"[.-]", r) if t and not t.isdigit())
+    words = list(dict.fromkeys([t for t, _ in counts.most_common(PERMUTE_TOKENS)] + list(_PERMUTE_WORDS)))
+    # word-major, so every name gets a go with the best words before any
+    # name gets the worst ones
+    def _each(fn):
+        for w in words:
+            for r in rels:
+                yield from fn(r, w)
+
+    cands = itertools.chain((c for r in rels for fn in (_numbered, _flipped) for c in fn(r)),
+                            _each(_swapped), _each(_dashed), _each(_dotted))
+    out = {}    # insertion ordered set
+    for c in cands:
+        if c in out or f"{c}.{domain}" in known:
+            continue
+        if len(c) + cut > 253 or not _WORD_RX.match(c.encode()):
+            continue
+        out[c] = None
+        if len(out) >= budget:
+            break
+    return list(out)
+
+
+def from_permutations(domain, names=(), wildcard=None, budget=PERMUTE_BUDGET, **kw):
+    return from_bruteforce(domain, wildcard, words=permutations(names, domain, budget), **kw)
+
+
+# --- recursive brute-force ---
+# brute-forces the top of the wordlist under sub-zones, one level at a time.
+# a zone is only dug into with evidence that something lives under it: a
+# found name below it, or a NOERROR-empty answer (an empty non-terminal like
+# corp.example.com when only eu.corp.example.com has records). NXDOMAIN
+# means the whole subtree is empty, so it's never expanded. hosts with
+# records of their own come after those in each round. each
+# sub-zone gets its own wildcard fingerprint on its first answer
+
+def _sub_zones(rels):
+    # every proper parent of each relative name
+    for rel in rels:
+        parts = rel.split(".")
+        for i in range(1, len(parts)):
+            yield ".".join(parts[i:])
+
+
+def recurse(domain, names, ents, brute, words=None, depth=RECURSE_DEPTH, budget=RECURSE_QUERIES):
+    # names: hosts found so far, ents: names seen answering NOERROR-empty,
+    # brute(labels, ents) -> found, like from_bruteforce with words=labels.
+    # returns the new hosts found under the sub-zones
+    words = list(itertools.islice(_load_words() if words is None else words, RECURSE_WORDS))
+    if not words or budget <= 0 or depth <= 0:
+        return []
+    cut = len(domain) + 1
+    found, ents = set(names), set(ents)
+    out, tried = [], set()
+    while True:
+        rels = [n[:-cut] for n in found if n.endswith("." + domain)]
+        rank = {}   # zone -> 0 proven non-terminal, 1 just a host
+        for z in rels:
+            rank.setdefault(z, 1)
+        for z in itertools.chain(_sub_zones(rels), (n[:-cut] for n in ents if n.endswith("." + domain))):
+            rank[z] = 0
+        zones = sorted((r, z.count(".") + 1, z) for z, r in rank.items()
+                       if z not in tried and z.count(".") < depth)
+        zones = [z for _, _, z in zones[:budget // len(words)]]
+        if not zones:
+            return sorted(out)
+        budget -= len(zones) * len(words)
+        tried.update(zones)
+        level = set()
+        hits = brute([f"{w}.{z}" for z in zones for w in words], level)
+        out += [h for h in hits if h not in found]
+        found.update(hits)
+        ents |= level
+
+
+def from_recursive(domain, names=(), ents=(), wildcard=None, words=None, depth=RECURSE_DEPTH,
+                   budget=RECURSE_QUERIES, **kw):
+    return recurse(domain, names, ents,
+                   lambda labels, level: from_bruteforce(domain, wildcard, words=labels, ents=level, **kw),
+                   words, depth, budget)
+
+
+# maps frontend pill keys to functions
+SOURCES = {
+    "crtsh": from_crtsh,
+    "hackertarget": from_hackertarget,
+    "alienvault": from_alienvault,
+    "rapiddns": from_rapiddns,
+    "bufferover": from_bufferover,
+    "virustotal": from_virustotal,
+    "sublister": from_sublister,
+    "brute": from_bruteforce,
+    "permute": from_permutations,
+    "recurse": from_recursive,
+}
+
+# run one after the other once the rest are done, in this order
+LATE_SOURCES = ("permute", "recurse")
+
+SOURCE_SCORE = {
+    "crtsh": 20, "hackertarget": 15, "alienvault": 15,
+    "rapiddns": 10, "bufferover": 10, "virustotal": 15,
+    "sublister": 10, "brute": 10, "permute": 10, "recurse": 10,
+}
+
+
+# --- dns enrichment ---
+
+DNS_TYPES = ("A", "AAAA", "CNAME", "MX", "NS", "TXT")
+
+# record types looked up during enrichment, "fast" is enough to decide what
+# gets probed; types left out just stay empty in the result
+DNS_PROFILES = {
+    "full": DNS_TYPES,
+    "web": ("A", "AAAA", "CNAME"),
+    "fast": ("A",),
+}
+
+
+def _empty_dns():
+    return {"A": [], "AAAA": [], "CNAME": None, "MX": [], "NS": [], "TXT": []}
+
+
+def _set_record(info, rtype, values):
+    if rtype == "CNAME":
+        info["CNAME"] = values[0] if values else None
+    else:
+        info[rtype] = values
+
+
+async def get_dns_records_async(subdomain, pool=None, types=DNS_TYPES, known=None):
+    # every type goes out at once, so a slow host costs one DNS_TO, not six.
+    # types already in known (answers a source held on to) aren't asked again
+    info = _empty_dns()
+    if known:
+        info.update(known)
+        types = [t for t in types if t not in known]
+
+    async def _one(rtype):
+        try:
+            rec = await resolve_async(subdomain, rtype, pool)
+            if rec["values"]:
+                _set_record(info, rtype, rec["values"])
+        except Exception:
+            pass
+
+    await asyncio.gather(*(_one(t) for t in types))
+    return info
+
+
+def get_dns_records(subdomain, pool=None, types=DNS_TYPES, known=None):
+    return asyncio.run(get_dns_records_async(subdomain, pool, types, known))
+
+
+def get_dns_records_batch(subdomains, pool=None, types=DNS_TYPES, known=None):
+    # same output as get_dns_records, but every (host, type) pair goes out
+    # through one udp batch resolver instead of a resolver per host
+    known = known or {}
+    out = {}
+    for sub in subdomains:
+        out[sub] = _empty_dns()
+        out[sub].update(known.get(sub, {}))
+    pairs = ((sub, rtype) for sub in out for rtype in types if rtype not in known.get(sub, {}))
+    for sub, rtype, rec in UdpBatchResolver(pool).resolve_many(pairs):
+        if rec and rec["values"]:
+            _set_record(out[sub], rtype, rec["values"])
+    return out
+
+
+# --- http probing ---
+
+# fallback signatures if fingerprints.json is missing, matched anywhere
+_TECH = {
+    "nginx": r"nginx",
+    "apache": r"Apache",
+    "cloudflare": r"cloudflare",
+    "aws": r"amazonaws|CloudFront",
+    "vercel": r"vercel",
+    "wordpress": r"wp-content|wordpress",
+    "django": r"csrftoken",
+    "laravel": r"laravel_session",
+    "rails": r"_rails_session",
+    "react": r"__next|_next/static",
+    "iis": r"Microsoft-IIS",
+    "tomcat": r"Apache-Coyote",
+    "fastly": r"Fastly",
+}
+
+
+def get_page_title(html):
+    m = re.search(r"<title[^>]*>([^<]{1,180})</title>", html, re.I)
+    return m.group(1).strip() if m else None
+
+
+# only the head of a page matters (title + the first 3000 chars detect_tech
+# looks at), so probes stop reading once they have that or hit the budget
+_TECH_WINDOW = 3000
+_TITLE_END = re.compile(rb"</title>", re.I)
+
+
+def _head_done(buf):
+    return len(buf) >= PROBE_BODY_MAX or (len(buf) >= _TECH_WINDOW and _TITLE_END.search(buf))
+
+
+def _join_headers(headers):
+    # dict() of aiohttp's headers keeps only the first of a repeated header
+    # (several Set-Cookie lines, say); join them the way requests does
+    out = {}
+    for k, v in headers.items():
+        out[k] = f"{out[k]}, {v}" if k in out else v
+    return out
+
+
+def _decode_body(raw, charset):
+    try:
+        return raw.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")    # a charset python doesn't know
+
+
+# a probe that stopped early only truncated the page if some of it was left
+# unread. a chunked body whose closing chunk hasn't come in yet still counts
+def _raw_left(raw):
+    # urllib3 closes the response at the end of the body; decoded bytes it
+    # hasn't handed out yet sit in its buffer
+    return not raw.closed or len(getattr(raw, "_decoded_buffer", b"")) > 0
+
+
+# --- tech fingerprinting ---
+# signatures are grouped by scope (headers, cookies, body, or any of them).
+# plain-literal signatures, which is nearly all of them, are folded into one
+# trie-shaped regex per scope, so the text is scanned once and each position
+# costs a walk down the trie rather than a try of every signature; the few
+# real regexes share one alternation per scope
+
+_SCOPES = ("headers", "cookies", "body", "any")
+_RX_META = set(".^$*+?{}[]()|\\")
+
+
+def _literal(piece):
+    # the literal a regex piece stands for, or None if it is a real regex
+    out, i = [], 0
+    while i < len(piece):
+        c = piece[i]
+        if c == "\\":
+            if i + 1 < len(piece) and not piece[i + 1].isalnum():
+                out.append(piece[i + 1])
+                i += 2
+                continue
+            return None
+        if c in _RX_META:
+            return None
+        out.append(c)
+        i += 1
+    return "".join(out).lower() or None
+
+
+def _trie_regex(words):
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _rx(node):
+        branches = [re.escape(ch) + _rx(sub) for ch, sub in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(branches) + ")?"
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return _rx(trie)
+
+
+class Fingerprints:
+    def __init__(self, sigs):
+        # sigs: [{"tech": name, "match": regex, "in": scope}, ...]
+        self.order = {}
+        self.literals = {sc: {} for sc in _SCOPES}     # scope -> literal -> {techs}
+        self.groups = {}                                # regex group name -> tech
+        regexes = {sc: [] for sc in _SCOPES}
+        for i, sig in enumerate(sigs):
+            tech, pat, sc = sig["tech"], sig["match"], sig.get("in", "any")
+            self.order.setdefault(tech, i)
+            pieces = [pat] if set(pat) & set("()[]") else re.split(r"(?<!\\)\|", pat)
+            for j, piece in enumerate(pieces):
+                lit = _literal(piece)
+                if lit:
+                    self.literals[sc].setdefault(lit, set()).add(tech)
+                else:
+                    self.groups[f"f{i}_{j}"] = tech
+                    regexes[sc].append(f"(?P<f{i}_{j}>{piece})")
+        self.trie = {}
+        self.rx = {}
+        for sc in _SCOPES:
+            if self.literals[sc]:
+                # lookahead so matches starting inside another match still count
+                self.trie[sc] = re.compile(f"(?=({_trie_regex(self.literals[sc])}))", re.I)
+            if regexes[sc]:
+                self.rx[sc] = re.compile("|".join(regexes[sc]), re.I)
+
+    @classmethod
+    def load(cls, path=FINGERPRINTS):
+        if path.exists():
+            return cls(json.loads(path.read_text(encoding="utf-8")))
+        return cls([{"tech": t, "match": p, "in": "any"} for t, p in _TECH.items()])
+
+    def match(self, headers, body):
+        heads, cookies = [], []
+        for k, v in headers.items():
+            (cookies if k.lower() == "set-cookie" else heads).append(f"{k}: {v}")
+        texts = {"headers": "\n".join(heads), "cookies": "\n".join(cookies), "body": body[:_TECH_WINDOW]}
+        texts["any"] = "\n".join(texts.values())
+        found = set()
+        for sc, rx in self.trie.items():
+            lits = self.literals[sc]
+            for m in rx.finditer(texts[sc]):
+                hit = m.group(1).lower()
+                # the trie takes the longest literal at a spot, shorter ones
+                # ending inside it ("apache" in "apache-coyote") count too
+                for k in range(1, len(hit) + 1):
+                    if hit[:k] in lits:
+                        found.update(lits[hit[:k]])
+        for sc, rx in self.rx.items():
+            for m in rx.finditer(texts[sc]):
+                found.add(self.groups[m.lastgroup])
+        return sorted(found, key=self.order.get)
+
+
+_FINGERPRINTS = Fingerprints.load()
+
+
+def detect_tech(headers, body):
+    return _FINGERPRINTS.match(headers, body)
+
+
+def _port_open(host, port, timeout=PRECHECK_TO):
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+def http_probe(subdomain, race=PROBE_RACE, schemes=("https", "http")):
+    result = _empty_probe()
+
+    # threads can't race cheaply, so a quick connect to :443 decides whether
+    # https is worth a full HTTP_TO wait before falling back to http
+    if race and len(schemes) == 2 and ":" not in subdomain and not _port_open(subdomain, 443):
+        schemes = ("http",)
+
+    for scheme in schemes:
+        url = f"{scheme}://{subdomain}"
+        try:
+            t0 = time.monotonic()
+            with get_http().get(
+                url, timeout=HTTP_TO, allow_redirects=True, verify=False, stream=True,
+                headers={"User-Agent": "Mozilla/5.0 (compatible; SubScan)"}
+            ) as r:
+                buf, truncated = bytearray(), False
+                for chunk in r.iter_content(8192):
+                    buf += chunk
+                    if _head_done(buf):
+                        truncated = _raw_left(r.raw)
+                        break
+                body = _decode_body(bytes(buf[:PROBE_BODY_MAX]), r.encoding)
+                ms = round((time.monotonic() - t0) * 1000)
+                result.update({
+                    "alive": True,
+                    "status": r.status_code,
+                    "url": r.url,
+                    "response_ms": ms,
+                    "title": get_page_title(body),
+                    "tech": detect_tech(dict(r.headers), body),
+                    "redirect": r.url if r.url != url else None,
+                    "truncated": truncated,
+                })
+            break
+        except requests.exceptions.SSLError:
+            continue
+        except Exception:
+            continue
+
+    return result
+
+
+# --- async http probing ---
+# same result dicts as http_probe, but thousands of probes share one event
+# loop; hosts are connected to by the A records enrichment already found,
+# so nothing waits on getaddrinfo threads
+
+def _known_hosts(addrs):
+    # built on first use like the rest of the aiohttp bits, see _probe_session
+    from aiohttp.abc import AbstractResolver
+    from aiohttp.resolver import ThreadedResolver
+
+    class _KnownHosts(AbstractResolver):
+        def __init__(self):
+            self.addrs = addrs      # hostname -> [ip, ...]
+            self._fallback = ThreadedResolver()
+
+        async def resolve(self, host, port=0, family=socket.AF_INET):
+            ips = self.addrs.get(host)
+            if not ips:
+                # redirects can lead anywhere, look those up the normal way
+                return await self._fallback.resolve(host, port, family)
+            return [{"hostname": host, "host": ip, "port": port, "family": socket.AF_INET,
+                     "proto": 0, "flags": socket.AI_NUMERICHOST} for ip in ips]
+
+        async def close(self):
+            await self._fallback.close()
+
+    return _KnownHosts()
+
+
+def _empty_probe():
+    return {"alive": False, "status": None, "url": None, "redirect": None,
+            "title": None, "tech": [], "response_ms": None, "truncated": False, "ports": [], "web": []}
+
+
+# title + tech detection is the cpu-heavy part of a probe. with a cpu pool,
+# responses are gathered per event loop and sent over ANALYSE_BATCH at a
+# time, cut down to the part the regexes look at; a handful of stragglers
+# is quicker to do inline than to ship
+_TITLE_CLOSE = re.compile(r"</title>", re.I)
+
+
+def _page_head(body):
+    m = _TITLE_CLOSE.search(body)
+    return body[:max(_TECH_WINDOW, m.end() if m else 0)]
+
+
+def _analyse_many(items):
+    return [(get_page_title(body), detect_tech(headers, body)) for headers, body in items]
+
+
+class _Analyser:
+    def __init__(self, loop):
+        self._loop = loop
+        self._items = []        # (headers, page head, future)
+        self._timer = None
+
+    def analyse(self, headers, body):
+        fut = self._loop.create_future()
+        self._items.append((headers, _page_head(body), fut))
+        if len(self._items) >= ANALYSE_BATCH:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(0.02, self._flush)
+        return fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        work = [(h, b) for h, b, _ in items]
+        pool = get_cpu_pool() if len(items) >= 8 else None
+        if pool is None:
+            self._settle(items, _analyse_many(work))
+            return
+        try:
+            done = asyncio.wrap_future(pool.submit(_analyse_many, work), loop=self._loop)
+        except Exception:
+            _drop_cpu_pool(pool)
+            self._settle(items, _analyse_many(work))
+            return
+
+        def _back(f):
+            if f.cancelled() or f.exception() is not None:
+                _drop_cpu_pool(pool)
+                self._settle(items, _analyse_many(work))
+            else:
+                self._settle(items, f.result())
+
+        done.add_done_callback(_back)
+
+    @staticmethod
+    def _settle(items, results):
+        for (_, _, fut), res in zip(items, results):
+            if not fut.done():
+                fut.set_result(res)
+
+
+_ANALYSERS = weakref.WeakKeyDictionary()    # event loop -> _Analyser
+
+
+async def _analyse(headers, body):
+    if CPU_WORKERS <= 1:
+        return get_page_title(body), detect_tech(headers, body)
+    loop = asyncio.get_running_loop()
+    an = _ANALYSERS.get(loop)
+    if an is None:
+        an = _ANALYSERS[loop] = _Analyser(loop)
+    return await an.analyse(headers, body)
+
+
+async def _fetch(session, url):
+    t0 = time.monotonic()
+    async with session.get(url, allow_redirects=True) as r:
+        buf, truncated = bytearray(), False
+        async for chunk in r.content.iter_chunked(8192):
+            buf += chunk
+            if _head_done(buf):
+                truncated = not r.content.at_eof()
+                break
+        body = _decode_body(bytes(buf[:PROBE_BODY_MAX]), r.charset)
+        ms = round((time.monotonic() - t0) * 1000)
+        final = str(r.url)
+        title, tech = await _analyse(_join_headers(r.headers), body)
+        return {
+            "alive": True,
+            "status": r.status,
+            "url": final,
+            "response_ms": ms,
+            "title": title,
+            "tech": tech,
+            "redirect": final if r.history else None,
+            "truncated": truncated,
+        }
+
+
+def _won(task):
+    return task.done() and not task.cancelled() and task.exception() is None
+
+
+async def _race(session, subdomain):
+    # both schemes start together; https is preferred, so if http answers
+    # first https still gets SCHEME_GRACE seconds to catch up. a plain-http
+    # host now costs one timeout at most instead of an https one plus http
+    https = asyncio.ensure_future(_fetch(session, f"https://{subdomain}"))
+    http = asyncio.ensure_future(_fetch(session, f"http://{subdomain}"))
+    try:
+        await asyncio.wait([https, http], return_when=asyncio.FIRST_COMPLETED)
+        if not https.done():
+            await asyncio.wait([https], timeout=SCHEME_GRACE if _won(http) else None)
+        if not _won(https) and not http.done():
+            await asyncio.wait([http])
+        for t in (https, http):
+            if _won(t):
+                return t.result()
+        return None
+    finally:
+        for t in (https, http):
+            if not t.done():
+                t.cancel()
+
+
+async def http_probe_async(session, subdomain, race=PROBE_RACE, schemes=("https", "http")):
+    result = _empty_probe()
+
+    if race and len(schemes) == 2:
+        found = await _race(session, subdomain)
+        if found:
+            result.update(found)
+        return result
+
+    for scheme in schemes:
+        try:
+            result.update(await _fetch(session, f"{scheme}://{subdomain}"))
+            break
+        except Exception:
+            continue
+
+    return result
+
+
+def _probe_session(addrs, concurrency=PROBE_CONCURRENCY, per_host=PROBE_PER_HOST):
+    # aiohttp is the slowest import we have and only the async prober needs
+    # it, so it's pulled in here instead of at module load
+    import aiohttp
+
+    conn = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ssl=False,
+                                resolver=_known_hosts(addrs), ttl_dns_cache=300)
+    return aiohttp.ClientSession(
+        connector=conn, timeout=aiohttp.ClientTimeout(total=HTTP_TO),
+        headers={"User-Agent": "Mozilla/5.0 (compatible; SubScan)"}, cookie_jar=aiohttp.DummyCookieJar()
+    )
+
+
+# --- port pre-scan ---
+# optional connect sweep over a few ports per host before probing, so mail
+# and infra boxes with no web port never tie up a probe for HTTP_TO, and
+# web servers on non-standard ports still get probed. every open port is
+# probed; the row's own url/status/title come from the first that answers
+# (80/443 before the rest) and "web" lists each one that did
+
+async def open_ports(ip, ports, timeout=PORTSCAN_TO):
+    async def _one(port):
+        try:
+            _, w = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+            w.close()
+            return port
+        except Exception:
+            return None
+
+    return sorted(p for p in await asyncio.gather(*(_one(p) for p in ports)) if p)
+
+
+def _web_targets(sub, ports_open):
+    # [(host to probe, schemes to try)], empty when no web port is open
+    targets = []
+    if 443 in ports_open and 80 in ports_open:
+        targets.append((sub, ("https", "http")))
+    elif 443 in ports_open:
+        targets.append((sub, ("https",)))
+    elif 80 in ports_open:
+        targets.append((sub, ("http",)))
+    targets += [(f"{sub}:{p}", ("https", "http")) for p in ports_open if p not in (80, 443)]
+    return targets
+
+
+def _merge_web(results, found):
+    res = next((r for r in results if r["alive"]), None) or _empty_probe()
+    res["web"] = [{"url": r["url"], "status": r["status"], "title": r["title"]}
+                  for r in results if r["alive"]]
+    res["ports"] = found
+    return res
+
+
+async def _sweep_and_probe(session, sub, addrs, ports):
+    if not ports:
+        return await http_probe_async(session, sub)
+    found = await open_ports(addrs[sub][0], ports)
+    results = await asyncio.gather(*(http_probe_async(session, host, schemes=schemes)
+                                     for host, schemes in _web_targets(sub, found)))
+    return _merge_web(results, found)
+
+
+async def probe_stream(next_host, on_result, addrs, concurrency=PROBE_CONCURRENCY,
+                       per_host=PROBE_PER_HOST, deadline=PROBE_DEADLINE, ports=None):
+    # next_host() blocks until a host is ready and returns None once there
+    # are no more; hosts left when the deadline passes go back unprobed,
+    # marked "skipped". the clock starts at the first host, not while the
+    # sources are still finding them. deadline=None means no overall
+    # cutoff, only the per-request timeouts
+    end = None
+    feed = asyncio.Queue(concurrency)
+
+    async def _feeder():
+        nonlocal end
+        while True:
+            sub = await asyncio.to_thread(next_host)
+            if sub is None:
+                break
+            if end is None and deadline:
+                end = time.monotonic() + deadline
+            await feed.put(sub)
+        for _ in range(concurrency):
+            await feed.put(None)
+
+    async with _probe_session(addrs, concurrency, per_host) as session:
+        async def _worker():
+            while True:
+                sub = await feed.get()
+                if sub is None:
+                    return
+                left = end - time.monotonic() if end else None
+                res = _empty_probe()
+                if left is None or left > 0:
+                    try:
+                        res = await asyncio.wait_for(_sweep_and_probe(session, sub, addrs, ports), left)
+                    except Exception:
+                        if end and time.monotonic() >= end:
+                            res["skipped"] = True   # cut off, not dead
+                else:
+                    res["skipped"] = True
+                on_result(sub, res)
+
+        await asyncio.gather(_feeder(), *(_worker() for _ in range(concurrency)))
+
+
+def probe_many(subdomains, addrs=None, **kw):
+    subs = iter(list(subdomains))
+    out = {}
+    asyncio.run(probe_stream(lambda: next(subs, None), out.__setitem__, addrs or {}, **kw))
+    return out
+
+
+def confidence(sources, dns_info, http_info):
+    score = sum(SOURCE_SCORE.get(s, 5) for s in sources)
+    if dns_info.get("A"):
+        score += 20
+    if http_info.get("alive"):
+        score += 20
+    return min(score, 100)
+
+
+# --- scan store ---
+# keeps the last scan of every domain (one row per host plus when its records
+# and probe were collected) so a rescan can skip hosts that are still fresh
+# and report what changed since
+
+class ScanStore:
+    def __init__(self, path=SCAN_STORE):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hosts ("
+            "domain TEXT, subdomain TEXT, dns_at REAL, http_at REAL, row TEXT, "
+            "PRIMARY KEY (domain, subdomain))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS scans (domain TEXT, scanned_at TEXT, stats TEXT)"
+        )
+        # first label of every host any scan has found, once per domain
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS labels (label TEXT, domain TEXT, PRIMARY KEY (label, domain)) "
+            "WITHOUT ROWID"
+        )
+        # brute-force runs that asked for a label, and how many it answered in
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS brute (label TEXT PRIMARY KEY, tries INTEGER, hits INTEGER) "
+            "WITHOUT ROWID"
+        )
+
+    def load(self, domain):
+        # subdomain -> (dns_at, http_at, row)
+        with self._lock:
+            cur = self._db.execute(
+                "SELECT subdomain, dns_at, http_at, row FROM hosts WHERE domain = ?", (domain,)
+            )
+            return {sub: (dns_at, http_at, json.loads(row)) for sub, dns_at, http_at, row in cur}
+
+    def rows(self, domain, offset=0, limit=1000):
+        # one page of saved rows, in subdomain order, so a client can catch up
+        # without the whole snapshot being loaded at once
+        with self._lock:
+            cur = self._db.execute(
+                "SELECT row FROM hosts WHERE domain = ? ORDER BY subdomain LIMIT ? OFFSET ?",
+                (domain, limit, offset)
+            )
+            return [json.loads(row) for row, in cur]
+
+    def save(self, domain, entries, stats):
+        # entries: (subdomain, dns_at, http_at, row); replaces the whole snapshot
+        labels = set()
+
+        def _hosts():
+            for sub, dns_at, http_at, row in entries:
+                if sub.endswith("." + domain):
+                    labels.add(sub.split(".", 1)[0])
+                yield domain, sub, dns_at, http_at, json.dumps(row)
+
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute("DELETE FROM hosts WHERE domain = ?", (domain,))
+                self._db.executemany("INSERT INTO hosts VALUES (?, ?, ?, ?, ?)", _hosts())
+                self._db.executemany("INSERT OR IGNORE INTO labels VALUES (?, ?)",
+                                     ((lb, domain) for lb in labels))
+                self._db.execute(
+                    "INSERT INTO scans VALUES (?, ?, ?)",
+                    (domain, stats.get("scanned_at"), json.dumps(stats))
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def record_brute(self, tried, hits):
+        # one brute-force run: every label in tried was asked for, hits answered
+        hits = set(hits)
+        rows = [(lb, 1 if lb in hits else 0) for lb in set(tried) | hits]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO brute VALUES (?, 1, ?) "
+                    "ON CONFLICT (label) DO UPDATE SET tries = tries + 1, hits = hits + excluded.hits", rows
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def label_scores(self, limit=LEARN_TOP, prior=LEARN_PRIOR):
+        # [(label, expected brute-force hit rate)], best first. the rate is
+        # hits / tries from past runs, pulled toward the share of scanned
+        # domains any source found the label on, worth `prior` tries: a label
+        # that's rarely been asked for leans on how common it is, one asked
+        # for often on its own record
+        with self._lock:
+            domains = self._db.execute("SELECT COUNT(DISTINCT domain) FROM labels").fetchone()[0]
+            rows = self._db.execute(
+                "SELECT l.label, l.n, COALESCE(b.tries, 0), COALESCE(b.hits, 0) FROM "
+                "(SELECT label, COUNT(*) AS n FROM labels GROUP BY label HAVING n >= ?) AS l "
+                "LEFT JOIN brute AS b ON b.label = l.label", (LEARN_MIN,)
+            ).fetchall()
+        scored = [(lb, (hits + prior * n / domains) / (tries + prior)) for lb, n, tries, hits in rows]
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:limit]
+
+
+_STORE = None
+
+
+def get_store():
+    global _STORE
+    if SCAN_STORE is None:
+        return None
+    with _POOL_LOCK:
+        if _STORE is None:
+            try:
+                _STORE = ScanStore(SCAN_STORE)
+            except sqlite3.Error:
+                return None
+        return _STORE
+
+
+def _row_dns(row):
+    return {"A": row["ip"], "AAAA": row["ipv6"], "CNAME": row["cname"],
+            "MX": row["mx"], "NS": row["ns"], "TXT": row["txt"]}
+
+
+def _row_http(row):
+    return {k: row.get(k, v) for k, v in _empty_probe().items()}
+
+
+_DIFF_FIELDS = ("ip", "status", "title")
+_DNS_FIELDS = ("ip", "ipv6", "cname", "mx", "ns", "txt")
+_HTTP_FIELDS = tuple(_empty_probe())
+
+
+def _row_changes(old, row, fields=_DIFF_FIELDS):
+    out = []
+    for field in fields:
+        a, b = old.get(field), row.get(field)
+        if isinstance(a, list):
+            a, b = sorted(a), sorted(b or [])
+        if a != b:
+            out.append({"subdomain": row["subdomain"], "field": field, "old": a, "new": b})
+    return out
+
+
+# --- batch scheduler ---
+# run_batch scans many domains at once; instead of every domain spinning up
+# its own thread pools and prober they all feed one Batch, which hands out
+# work round-robin by domain so one huge domain can't starve the rest
+
+class _FairQueue:
+    def __init__(self):
+        self._cv = threading.Condition()
+        self._items = {}        # key -> deque of items
+        self._turn = deque()    # keys with items waiting, in serving order
+        self._closed = False
+
+    def put(self, key, item):
+        with self._cv:
+            q = self._items.get(key)
+            if q is None:
+                q = self._items[key] = deque()
+                self._turn.append(key)
+            q.append(item)
+            self._cv.notify()
+
+    def get(self):
+        # blocks until there's an item; None once closed and drained
+        with self._cv:
+            while not self._turn:
+                if self._closed:
+                    return None
+                self._cv.wait()
+            key = self._turn.popleft()
+            q = self._items[key]
+            item = q.popleft()
+            if q:
+                self._turn.append(key)
+            else:
+                del self._items[key]
+            return item
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+
+
+class Batch:
+    def __init__(self, pool, workers=MAX_W, ports=None, async_probe=True):
+        self.pool = pool
+        self._work = _FairQueue()
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        self._probes = _FairQueue()
+        self._addrs = {}
+        self._routes = {}       # subdomain -> callbacks waiting on its probe
+        self._lock = threading.Lock()
+        if async_probe:
+            # one event loop and one aiohttp session for the whole batch
+            self._threads.append(threading.Thread(
+                target=lambda: asyncio.run(probe_stream(self._probes.get, self._probed, self._addrs,
+                                                        deadline=None, ports=ports)),
+                daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def _worker(self):
+        while True:
+            job = self._work.get()
+            if job is None:
+                return
+            fut, fn, args = job
+            if fut.set_running_or_notify_cancel():
+                try:
+                    fut.set_result(fn(*args))
+                except BaseException as e:
+                    fut.set_exception(e)
+
+    def submit(self, key, fn, *args):
+        fut = Future()
+        self._work.put(key, (fut, fn, args))
+        return fut
+
+    def probe(self, key, sub, ips, on_result):
+        # the same host can come up under two domains of a batch (ex.com and
+        # dev.ex.com), so callbacks queue up per host
+        with self._lock:
+            self._addrs[sub] = ips
+            self._routes.setdefault(sub, deque()).append(on_result)
+        self._probes.put(key, sub)
+
+    def _probed(self, sub, res):
+        with self._lock:
+            waiting = self._routes[sub]
+            on_result = waiting.popleft()
+            if not waiting:
+                del self._routes[sub]
+                self._addrs.pop(sub, None)
+        on_result(sub, dict(res))
+
+    def close(self):
+        self._work.close()
+        self._probes.close()
+        for t in self._threads:
+            t.join()
+
+
+# --- distributed jobs ---
+# a coordinator (run_scan with jobs=) turns brute-force word chunks,
+# enrichment batches and probe batches into rows of a sqlite queue; any number
+# of worker processes (work(), or cli.py --worker) claim them, run them and
+# write the results back. a claimed job carries a lease, so one whose worker
+# died goes back out after JOB_LEASE seconds. the db runs in WAL mode, whose
+# shared-memory index is per host, so coordinator and workers must share a
+# machine; a network filesystem won't do
+
+class JobQueue:
+    def __init__(self, path=JOBS_DB):
+        self.owner = f"{socket.gethostname()}-{random.getrandbits(32):08x}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, owner TEXT, kind TEXT, payload TEXT, state TEXT, "
+            "tries INTEGER, lease REAL, created REAL, result TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, state)")
+        # results nobody came back for, e.g. from a coordinator that crashed;
+        # queued / running jobs may still have a coordinator waiting on them
+        self._db.execute("DELETE FROM jobs WHERE state IN ('done', 'failed') AND created < ?",
+                         (time.time() - JOB_KEEP,))
+        self._waiting = {}      # job id -> Future, for jobs this process put in
+        self._poller = None
+        self._checked = 0.0     # last look for waited-on jobs gone from the db
+
+    # coordinator side
+
+    def submit(self, kind, payload):
+        fut = Future()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO jobs (owner, kind, payload, state, tries, created) VALUES (?, ?, ?, 'queued', 0, ?)",
+                (self.owner, kind, json.dumps(payload), time.time())
+            )
+            self._waiting[cur.lastrowid] = fut
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, daemon=True)
+                self._poller.start()
+        return fut
+
+    def _poll(self):
+        # one thread per coordinator collects finished jobs and resolves their
+        # futures, so callbacks run here and must not block
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT id, state, result FROM jobs WHERE owner = ? AND state IN ('done', 'failed')",
+                    (self.owner,)
+                ).fetchall()
+                self._db.executemany("DELETE FROM jobs WHERE id = ?", ((r[0],) for r in rows))
+                futs = [(self._waiting.pop(job_id, None), state, result) for job_id, state, result in rows]
+            futs += self._vanished()
+            for fut, state, result in futs:
+                if fut is None or fut.done():
+                    continue
+                if state == "done":
+                    fut.set_result(json.loads(result))
+                else:
+                    fut.set_exception(RuntimeError(result))
+            if not rows:
+                time.sleep(JOB_POLL)
+
+    def _vanished(self):
+        # jobs this process waits on whose rows are gone (someone deleted
+        # them), failed so their waiters don't hang; checked every few seconds
+        if time.monotonic() - self._checked < 5:
+            return []
+        self._checked = time.monotonic()
+        with self._lock:
+            have = {r[0] for r in self._db.execute("SELECT id FROM jobs WHERE owner = ?", (self.owner,))}
+            gone = [job_id for job_id in self._waiting if job_id not in have]
+            return [(self._waiting.pop(job_id), "failed", "job vanished from the queue") for job_id in gone]
+
+    # worker side
+
+    def claim(self):
+        # (id, kind, payload) of the oldest job that's queued or whose lease ran out
+        with self._lock:
+            while True:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._db.execute(
+                        "SELECT id, kind, payload, tries FROM jobs "
+                        "WHERE state = 'queued' OR (state = 'running' AND lease < ?) ORDER BY id LIMIT 1",
+                        (time.time(),)
+                    ).fetchone()
+                    if row and row[3] >= JOB_TRIES:
+                        self._db.execute(
+                            "UPDATE jobs SET state = 'failed', result = ? WHERE id = ?",
+                            (f"gave up after {row[3]} tries", row[0])
+                        )
+                    elif row:
+                        self._db.execute(
+                            "UPDATE jobs SET state = 'running', tries = tries + 1, lease = ? WHERE id = ?",
+                            (time.time() + JOB_LEASE, row[0])
+                        )
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+                if row is None:
+                    return None
+                if row[3] < JOB_TRIES:
+                    return row[0], row[1], json.loads(row[2])
+
+    def finish(self, job_id, result, ok=True):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, result = ? WHERE id = ? AND state = 'running'",
+                ("done" if ok else "failed", json.dumps(result) if ok else str(result), job_id)
+            )
+
+
+_JOB_POOLS = {}
+
+
+def _job_pool(p):
+    if not p.get("resolvers"):
+        return get_pool()
+    key = tuple(p["resolvers"])
+    with _POOL_LOCK:
+        if key not in _JOB_POOLS:
+            _JOB_POOLS[key] = ResolverPool(p["resolvers"])
+        return _JOB_POOLS[key]
+
+
+def _job_brute(p):
+    known = {}
+    wc = Wildcard.from_record(p["domain"], p["wildcard"]) if p.get("wildcard") else None
+    ents = set()
+    found = from_bruteforce(p["domain"], wc, engine=p["engine"], pool=_job_pool(p), known=known,
+                            words=p["words"], ents=ents, deadline=p.get("deadline"))
+    return {"found": found, "known": known, "ents": sorted(ents)}
+
+
+def _job_enrich(p):
+    pool, types, known = _job_pool(p), p["types"], p["known"]
+    if p["engine"] == "udp":
+        return get_dns_records_batch(p["subs"], pool, types, known)
+
+    async def _all():
+        recs = await asyncio.gather(*(get_dns_records_async(sub, pool, types, known.get(sub)) for sub in p["subs"]))
+        return dict(zip(p["subs"], recs))
+
+    return asyncio.run(_all())
+
+
+def _job_probe(p):
+    return probe_many(list(p["hosts"]), p["hosts"], ports=p.get("ports"))
+
+
+_JOB_KINDS = {"brute": _job_brute, "enrich": _job_enrich, "probe": _job_probe}
+
+
+def work(jobs=None, idle_exit=None):
+    # worker loop: one job at a time (each one is concurrent inside), until
+    # the queue has been empty for idle_exit seconds, or forever if None.
+    # returns how many jobs it ran
+    jobs = jobs or JobQueue()
+    ran = 0
+    idle_since = time.monotonic()
+    while True:
+        job = jobs.claim()
+        if job is None:
+            if idle_exit is not None and time.monotonic() - idle_since > idle_exit:
+                return ran
+            time.sleep(JOB_POLL)
+            continue
+        job_id, kind, payload = job
+        try:
+            jobs.finish(job_id, _JOB_KINDS[kind](payload))
+        except Exception as e:
+            jobs.finish(job_id, f"{type(e).__name__}: {e}", ok=False)
+        ran += 1
+        idle_since = time.monotonic()
+
+
+def from_bruteforce_jobs(jobs, domain, wildcard=None, engine=DNS_ENGINE, resolvers=None, known=None,
+                         words=None, ents=None, deadline=None):
+    # deadline is wall-clock (time.time()) so it means the same on every worker
+    words = iter(_load_words() if words is None else words)
+    base = {"domain": domain, "engine": engine, "resolvers": resolvers, "deadline": deadline,
+            "wildcard": wildcard.to_record() if wildcard is not None else None}
+    futs = []
+    while True:
+        chunk = list(itertools.islice(words, JOB_CHUNK))
+        if not chunk:
+            break
+        futs.append(jobs.submit("brute", dict(base, words=chunk)))
+    found = []
+    end = time.monotonic() + JOB_WAIT
+    for fut in futs:
+        try:
+            res = fut.result(timeout=max(0.0, end - time.monotonic()))
+        except Exception:
+            continue    # a chunk that kept failing (or never came back) just doesn't contribute
+        found += res["found"]
+        if known is not None:
+            known.update(res["known"])
+        if ents is not None:
+            ents.update(res.get("ents", ()))
+    return sorted(found)
+
+
+# --- main scan ---
+
+def build_row(domain, sub, srcs, d, h):
+    return {
+        "subdomain": sub,
+        "domain": domain,
+        "sources": sorted(srcs),
+        "source": sorted(srcs)[0],
+        "confidence": confidence(list(srcs), d, h),
+        "ip": d.get("A", []),
+        "ipv6": d.get("AAAA", []),
+        "cname": d.get("CNAME"),
+        "mx": d.get("MX", []),
+        "ns": d.get("NS", []),
+        "txt": d.get("TXT", []),
+        "alive": h.get("alive", False),
+        "status": h.get("status"),
+        "url": h.get("url"),
+        "redirect": h.get("redirect"),
+        "title": h.get("title"),
+        "tech": h.get("tech", []),
+        "response_ms": h.get("response_ms"),
+        "truncated": h.get("truncated", False),
+        "ports": h.get("ports", []),
+        "web": h.get("web", []),
+        "probe_skipped": h.get("skipped", False),
+    }
+
+
+def run_scan(domain, methods, workers=10, enrich=True, probe=True, engine=DNS_ENGINE, resolvers=None,
+             emit=None, probe_engine=PROBE_ENGINE, ports=None, dns_profile="full", incremental=False,
+             shared=None, jobs=None, wordlist=None, permute_budget=PERMUTE_BUDGET,
+             recurse_depth=RECURSE_DEPTH, recurse_budget=RECURSE_QUERIES, brute_budget=BRUTE_BUDGET,
+             brute_time=BRUTE_TIME):
+    # emit(kind, item), if given, is called from worker threads with ("log", line)
+    # as the scan goes and ("result", row) as each host finishes; a host that
+    # another source finds later is emitted again with its merged sources.
+    # ports, if given, turns on a tcp sweep of those ports before probing.
+    # incremental reuses the stored records / probe of any host the last scan
+    # saw less than SCAN_TTL ago; sources always run, so new hosts still show up.
+    # shared is the Batch this scan is part of when it's run by run_batch.
+    # jobs, a JobQueue, hands brute-force, enrichment and probing to workers.
+    # wordlist is a path (plain, .gz, .zst or compiled .wl) to brute-force
+    # with instead of WORDLIST. "permute" runs once the other sources are
+    # done, on mutations of what they found, up to permute_budget names;
+    # "recurse" after that, into sub-zones up to recurse_depth labels deep
+    # for at most recurse_budget queries. brute-force tries the best
+    # brute_budget words (0 = all) for at most brute_time seconds (0 = no limit)
+    logs = []
+
+    def _log(line):
+        logs.append(line)
+        if emit:
+            emit("log", line)
+
+    t0 = datetime.utcnow()
+
+    if not _valid_domain(domain):
+        return {"error": f"invalid domain: {domain}", "results": [], "logs": []}
+
+    _log(f"[{_ts()}] starting scan on {domain}")
+    _log(f"[{_ts()}] sources: {', '.join(methods)}")
+
+    if shared:
+        pool = shared.pool
+    else:
+        pool = ResolverPool(resolvers) if resolvers else get_pool()
+    types = DNS_PROFILES.get(dns_profile, DNS_TYPES)
+    _log(f"[{_ts()}] resolvers: {', '.join(f'{u.host}:{u.port}' for u in pool.upstreams)}")
+
+    words = None
+    if "brute" in methods or "recurse" in methods:
+        try:
+            words = rank_words(_load_words(wordlist), brute_budget)
+        except (OSError, RuntimeError, ValueError) as e:
+            return {"error": f"can't load wordlist: {e}", "results": [], "logs": [] if emit else logs}
+        _log(f"[{_ts()}] wordlist: {len(words)} of {len(words.words)} words, "
+             f"{len(words.top)} moved up from past scans")
+
+    wc = check_wildcard(domain, pool)
+    wc_ip = min(wc.ips) if wc.ips else None
+    if wc:
+        shown = ", ".join(sorted(wc.ips | wc.cnames))
+        _log(f"[{_ts()}] wildcard detected ({shown}) — brute results will be filtered")
+    else:
+        _log(f"[{_ts()}] no wildcard — good")
+
+    store = get_store()
+    try:
+        prev = store.load(domain) if store else {}
+    except sqlite3.Error:
+        prev = {}
+    reuse_dns, reuse_http = {}, {}  # subdomain -> when the stored data was collected
+    if incremental:
+        cutoff = time.time() - SCAN_TTL
+        for sub, (dns_at, http_at, _) in prev.items():
+            if dns_at and dns_at > cutoff:
+                reuse_dns[sub] = dns_at
+                # a probe result is only good while the records it went to are
+                if http_at and http_at > cutoff:
+                    reuse_http[sub] = http_at
+        _log(f"[{_ts()}] incremental: {len(reuse_dns)}/{len(prev)} stored hosts still fresh")
+
+    # sources -> dns enrichment -> http probe run as one pipeline: every new
+    # subdomain is handed to enrichment as soon as its source returns, and
+    # on to probing as soon as its records are in, with bounded queues
+    # between the stages so a fast source can't flood a slow one
+    seen = {}  # subdomain -> set of sources
+    known = {}  # subdomain -> dns answers a source already holds
+    ents = set()    # names that answered NOERROR-empty during brute-force
+    dns_cache = {}
+    http_cache = {}
+    enrich_q = queue.Queue(PIPE_QUEUE)
+    probe_q = queue.Queue(PIPE_QUEUE)
+    step = JOB_BATCH if jobs else 512 if engine == "udp" else 1    # udp enrichment works on batches
+    probed = []
+    done = set()
+    ran, failed = set(), set()  # sources that ran / raised
+    row_lock = threading.Condition()
+
+    def _emit_row(sub):
+        with row_lock:
+            row = build_row(domain, sub, seen[sub], dns_cache.get(sub, {}), http_cache.get(sub, {}))
+        emit("result", row)
+
+    def _brute(labels, level=ents, deadline=None):
+        if jobs:
+            return from_bruteforce_jobs(jobs, domain, wc, engine, resolvers, known, labels, level, deadline)
+        return from_bruteforce(domain, wc, engine=engine, pool=pool, known=known, words=labels, ents=level,
+                               deadline=deadline)
+
+    def _learn(hits):
+        # jobs mode hands out every chunk up front, so there a brute_time cut
+        # counts the words it skipped as tried
+        if not store:
+            return
+        cut = len(domain) + 1
+        try:
+            store.record_brute(words.tried(), [h[:-cut] for h in hits if h.endswith("." + domain)])
+        except sqlite3.Error:
+            pass
+
+    def _run(method):
+        fn = SOURCES.get(method)
+        if not fn:
+            return method, []
+        try:
+            if method == "brute":
+                result = _brute(words, deadline=time.time() + brute_time if brute_time else None)
+                _learn(result)
+            elif method == "permute":
+                with row_lock:
+                    names = list(seen)
+                cands = permutations(names, domain, permute_budget)
+                _log(f"[{_ts()}] permutations: {len(cands)} candidates from {len(names)} names")
+                result = _brute(cands)
+            elif method == "recurse":
+                with row_lock:
+                    names = list(seen)
+                result = recurse(domain, names, ents, _brute, words, recurse_depth, recurse_budget)
+            else:
+                result = fn(domain)
+        except Exception as e:
+            # a broken source must not stall the stages behind it, but it
+            # doesn't count as having looked either
+            _log(f"[{_ts()}] {method} failed: {e}")
+            failed.add(method)
+            result = []
+        ran.add(method)
+        return method, result
+
+    def _reused(batch):
+        recs = {sub: _row_dns(prev[sub][2]) for sub in batch if sub in reuse_dns}
+        return recs, [sub for sub in batch if sub not in recs]
+
+    def _enrich_batch(batch):
+        recs, todo = _reused(batch)
+        try:
+            if not todo:
+                pass
+            elif not enrich:
+                recs.update({sub: {} for sub in todo})
+            elif engine == "udp":
+                recs.update(get_dns_records_batch(todo, pool, types, known))
+            else:
+                recs.update({sub: get_dns_records(sub, pool, types, known.get(sub)) for sub in todo})
+        except Exception:
+            recs.update({sub: {} for sub in todo})
+        for sub, d in recs.items():
+            dns_cache[sub] = d
+            _to_probe(sub)
+
+    def _enrich_stage():
+        while True:
+            batch = enrich_q.get()
+            if batch is None:
+                return
+            _enrich_batch(batch)
+
+    def _finish(sub):
+        with row_lock:
+            done.add(sub)
+            row_lock.notify_all()
+        if emit:
+            _emit_row(sub)
+
+    # http probe — only bother with hosts that have an A record
+    def _wants_probe(sub):
+        if sub in reuse_http:
+            http_cache[sub] = _row_http(prev[sub][2])
+            return False
+        if probe and dns_cache[sub].get("A"):
+            probed.append(sub)
+            return True
+        return False
+
+    def _probe_one(sub):
+        if _wants_probe(sub):
+            ips = dns_cache[sub]["A"]
+            try:
+                if ports:
+                    found = asyncio.run(open_ports(ips[0], ports))
+                    http_cache[sub] = _merge_web([http_probe(host, schemes=schemes)
+                                                  for host, schemes in _web_targets(sub, found)], found)
+                else:
+                    http_cache[sub] = http_probe(sub)
+            except Exception:
+                pass
+        _finish(sub)
+
+    def _probe_stage():
+        while True:
+            sub = probe_q.get()
+            if sub is None:
+                return
+            _probe_one(sub)
+
+    def _probe_done(sub, res):
+        http_cache[sub] = res
+        _finish(sub)
+
+    # async engine: one thread runs the event loop, hosts without an A
+    # record are finished straight away instead of taking a probe slot
+    def _probe_stage_async():
+        addrs = {}
+
+        def _next():
+            while True:
+                sub = probe_q.get()
+                if sub is None:
+                    return None
+                if _wants_probe(sub):
+                    addrs[sub] = dns_cache[sub]["A"]
+                    return sub
+                _finish(sub)
+
+        asyncio.run(probe_stream(_next, _probe_done, addrs, ports=ports))
+
+    def _shared_probe(sub):
+        if probe_engine != "async":
+            shared.submit(domain, _probe_one, sub)
+        elif _wants_probe(sub):
+            shared.probe(domain, sub, dns_cache[sub]["A"], _probe_done)
+        else:
+            _finish(sub)
+
+    _to_probe = _shared_probe if shared else probe_q.put
+
+    # jobs mode: a batch goes out as one enrichment job, and once its records
+    # are back (on the queue's poller thread) as one probe job
+    def _enrich_job(batch):
+        recs, todo = _reused(batch)
+        if not todo or not enrich:
+            recs.update({sub: {} for sub in todo})
+            _probe_job(recs)
+            return
+
+        def _back(fut):
+            try:
+                recs.update(fut.result())
+            except Exception:
+                recs.update({sub: {} for sub in todo})
+            _probe_job(recs)
+
+        jobs.submit("enrich", {
+            "subs": todo, "types": list(types), "engine": engine, "resolvers": resolvers,
+            "known": {sub: known[sub] for sub in todo if sub in known},
+        }).add_done_callback(_back)
+
+    def _probe_job(recs):
+        want = []
+        for sub, d in recs.items():
+            dns_cache[sub] = d
+            if _wants_probe(sub):
+                want.append(sub)
+            else:
+                _finish(sub)
+        if not want:
+            return
+
+        def _back(fut):
+            try:
+                res = fut.result()
+            except Exception:
+                res = {}
+            for sub in want:
+                if sub in res:
+                    http_cache[sub] = res[sub]
+                _finish(sub)
+
+        jobs.submit("probe", {"hosts": {sub: dns_cache[sub]["A"] for sub in want}, "ports": ports}) \
+            .add_done_callback(_back)
+
+    def _collect(futs, to_enrich):
+        for fut in as_completed(futs):
+            method, found = fut.result()
+            _log(f"[{_ts()}] {method} -> {len(found)} results")
+            fresh, again = [], []
+            with row_lock:
+                for sub in found:
+                    if sub not in seen:
+                        fresh.append(sub)
+                    elif sub in done:
+                        again.append(sub)
+                    seen.setdefault(sub, set()).add(method)
+            if emit:
+                for sub in again:
+                    _emit_row(sub)
+            for i in range(0, len(fresh), step):
+                to_enrich(fresh[i:i + step])
+        _log(f"[{_ts()}] {len(seen)} unique subdomains after dedup")
+
+    def _sources(to_enrich):
+        # the late ones feed on what everything before them found
+        with ThreadPoolExecutor(max_workers=min(len(active) or 1, 8)) as ex:
+            _collect({ex.submit(_run, m): m for m in active if m not in LATE_SOURCES}, to_enrich)
+            for m in LATE_SOURCES:
+                if m in active and (seen or ents):
+                    _collect({ex.submit(_run, m): m}, to_enrich)
+
+    def _enriched():
+        if enrich and seen:
+            reused = f", reused source answers for {len(known)}" if known else ""
+            _log(f"[{_ts()}] dns enrichment done for {len(dns_cache)} hosts{reused}")
+
+    active = [m for m in methods if m in SOURCES]
+    if shared or jobs:
+        # batch / jobs mode: sources still get their own threads, but
+        # enrichment and probing go through the batch's scheduler alongside
+        # every other domain, or out to the job queue's workers
+        enriching = []
+        if jobs:
+            to_enrich = _enrich_job
+        else:
+            def to_enrich(batch):
+                enriching.append(shared.submit(domain, _enrich_batch, batch))
+        _sources(to_enrich)
+        for f in enriching:
+            f.result()
+        with row_lock:
+            if not row_lock.wait_for(lambda: len(done) >= len(seen), JOB_WAIT if jobs else None):
+                _log(f"[{_ts()}] {len(seen) - len(done)} hosts never came back from the job queue")
+        _enriched()
+    else:
+        n_enrich = 4 if engine == "udp" else MAX_W
+        with ThreadPoolExecutor(max_workers=n_enrich) as enrich_ex, \
+                ThreadPoolExecutor(max_workers=MAX_W) as probe_ex:
+            enrichers = [enrich_ex.submit(_enrich_stage) for _ in range(n_enrich)]
+            if probe_engine == "async":
+                probers = [probe_ex.submit(_probe_stage_async)]
+            else:
+                probers = [probe_ex.submit(_probe_stage) for _ in range(MAX_W)]
+
+            _sources(enrich_q.put)
+
+            for _ in enrichers:
+                enrich_q.put(None)
+            for f in enrichers:
+                f.result()
+            _enriched()
+            for _ in probers:
+                probe_q.put(None)
+            for f in probers:
+                f.result()
+
+    # a stored host only counts as removed if a source that found it last
+    # time looked again and didn't; the others are carried over as they were.
+    # with no source that ran cleanly there's nothing to compare, so the
+    # stored scan is left alone
+    looked = ran - failed
+    if not seen:
+        _log(f"[{_ts()}] nothing found")
+    elif probe:
+        alive = sum(1 for sub in probed if http_cache.get(sub, {}).get("alive"))
+        _log(f"[{_ts()}] {alive}/{len(probed)} hosts responded")
+        kept = [sub for sub in seen if sub in reuse_http]
+        if kept:
+            alive = sum(1 for sub in kept if http_cache.get(sub, {}).get("alive"))
+            _log(f"[{_ts()}] {alive}/{len(kept)} hosts alive in the last scan, not probed again")
+        skipped = sum(1 for h in http_cache.values() if h.get("skipped"))
+        if skipped:
+            _log(f"[{_ts()}] {skipped} hosts not probed, the probe stage hit its {PROBE_DEADLINE}s deadline")
+
+    if emit:
+        # rows already went out one by one, don't hold them all again here
+        results = []
+        total = len(seen)
+        n_alive = sum(1 for h in http_cache.values() if h.get("alive"))
+    else:
+        results = [build_row(domain, sub, srcs, dns_cache.get(sub, {}), http_cache.get(sub, {}))
+                   for sub, srcs in seen.items()]
+        total = len(results)
+        n_alive = sum(1 for r in results if r["alive"])
+
+    results.sort(key=lambda x: (-x["confidence"], x["subdomain"]))
+
+    cache = get_cache()
+    if cache:
+        cache.flush()
+
+    if emit:
+        rows = (build_row(domain, sub, srcs, dns_cache.get(sub, {}), http_cache.get(sub, {}))
+                for sub, srcs in seen.items())
+    else:
+        rows = results
+    gone = set(prev) - set(seen)
+    removed = {sub for sub in gone if looked & set(prev[sub][2].get("sources", []))}
+    diff = {"added": [], "removed": sorted(removed), "changed": []}
+    now = time.time()
+
+    def _entries():
+        for row in rows:
+            sub = row["subdomain"]
+            got_dns = enrich or sub in reuse_dns
+            h = http_cache.get(sub)
+            got_http = sub in reuse_http or (h is not None and not h.get("skipped")) \
+                or (probe and got_dns and not row["ip"])
+            dns_at = reuse_dns.get(sub) or (now if enrich and dns_cache.get(sub) else None)
+            http_at = reuse_http.get(sub) or (now if h is not None and not h.get("skipped") else None)
+            if sub not in prev:
+                diff["added"].append(sub)
+            else:
+                # what this scan didn't collect keeps its stored value
+                old_dns_at, old_http_at, old = prev[sub]
+                fields = [f for f in _DIFF_FIELDS if (got_dns if f in _DNS_FIELDS else got_http)]
+                diff["changed"] += _row_changes(old, row, fields)
+                if not got_dns:
+                    row = dict(row, **{f: old[f] for f in _DNS_FIELDS if f in old})
+                    dns_at = old_dns_at
+                if not got_http:
+                    row = dict(row, **{f: old[f] for f in _HTTP_FIELDS if f in old})
+                    http_at = old_http_at
+            yield sub, dns_at, http_at, row
+        for sub in gone - removed:
+            yield (sub, *prev[sub])
+
+    elapsed = round((datetime.utcnow() - t0).total_seconds(), 1)
+
+    stats = {
+        "total": total,
+        "alive": n_alive,
+        "sources_used": len(active),
+        "wildcard": bool(wc),
+        "wildcard_ip": wc_ip,
+        "wildcard_ips": sorted(wc.ips),
+        "wildcard_cnames": sorted(wc.cnames),
+        "resolvers": pool.stats(),
+        "dns_cache": {"hits": cache.hits, "misses": cache.misses} if cache else None,
+        "http_pool": get_http().stats(),
+        "reused": {"dns": len(reuse_dns.keys() & seen.keys()), "http": len(reuse_http.keys() & seen.keys())},
+        "elapsed": elapsed,
+        "scanned_at": t0.isoformat() + "Z",
+    }
+
+    stats["sources_failed"] = sorted(failed)
+    if not looked:
+        _log(f"[{_ts()}] no source ran cleanly, keeping the last saved scan")
+        prev = {}
+    else:
+        if gone - removed:
+            _log(f"[{_ts()}] {len(gone - removed)} stored hosts kept, the sources that found them didn't run")
+        entries = _entries()
+        try:
+            if store:
+                store.save(domain, entries, stats)
+                stats["saved"] = True   # clients that missed rows can page them from the store
+        except sqlite3.Error:
+            _log(f"[{_ts()}] couldn't save scan to {SCAN_STORE}")
+        for _ in entries:
+            pass    # whatever the store didn't take still has to go into the diff
+    if prev:
+        _log(f"[{_ts()}] since last scan: +{len(diff['added'])} new, "
+             f"-{len(diff['removed'])} gone, {len(diff['changed'])} changes")
+
+    _log(f"[{_ts()}] scan complete — {total} found, {n_alive} alive, took {elapsed}s")
+    data = {"results": results, "logs": [] if emit else logs, "stats": stats, "elapsed": elapsed}
+    if prev:
+        data["diff"] = diff
+    return data
+
+
+def run_batch(domains, methods, concurrency=BATCH_DOMAINS, workers=MAX_W, resolvers=None,
+              emit=None, probe_engine=PROBE_ENGINE, ports=None, **kw):
+    # generator: yields (domain, data) as each domain finishes. up to
+    # concurrency domains run at once, all sharing one resolver pool, http
+    # pool and Batch; emit, if given, gets (domain, kind, item)
+    pool = ResolverPool(resolvers) if resolvers else get_pool()
+    shared = Batch(pool, workers, ports, probe_engine == "async")
+    todo = iter(dict.fromkeys(d.strip().lower() for d in domains if d.strip()))
+
+    def _scan(domain):
+        on = (lambda kind, item: emit(domain, kind, item)) if emit else None
+        try:
+            # the shared pool already has resolvers, but job payloads need them
+            # spelled out for workers to build their own
+            return run_scan(domain, methods, emit=on, probe_engine=probe_engine, ports=ports,
+                            resolvers=resolvers, shared=shared, **kw)
+        except Exception as e:
+            return {"error": str(e), "results": [], "logs": []}
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            running = {}
+            for domain in todo:
+                running[ex.submit(_scan, domain)] = domain
+                if len(running) >= concurrency:
+                    break
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    yield running.pop(fut), fut.result()
+                    nxt = next(todo, None)
+                    if nxt:
+                        running[ex.submit(_scan, nxt)] = nxt
+    finally:
+        shared.close()
@@ -0,0 +1,62 @@
+# stub dns servers on localhost, so nothing here needs the network
+
+import socket
+import threading
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+import pytest
+
+import subscan
+
+
+def _serve(sk, mode, live, wildcard, seen):
+    while True:
+        try:
+            data, addr = sk.recvfrom(4096)
+        except OSError:
+            return
+        seen.append(addr)
+        if mode == "blackhole":
+            continue
+        q = dns.message.from_wire(data)
+        r = dns.message.make_response(q)
+        name = q.question[0].name.to_text().rstrip(".")
+        if mode == "servfail":
+            r.set_rcode(dns.rcode.SERVFAIL)
+        elif name in live or (wildcard and name.endswith("." + wildcard)):
+            if q.question[0].rdtype == dns.rdatatype.A:
+                r.answer.append(dns.rrset.from_text(name + ".", 300, "IN", "A", "10.0.0.1"))
+        else:
+            r.set_rcode(dns.rcode.NXDOMAIN)
+        sk.sendto(r.to_wire(), addr)
+
+
+@pytest.fixture
+def stub():
+    """stub(mode="zone", live=(), wildcard=None) -> ("127.0.0.1:port", addrs of queries seen)
+
+    modes: "zone" answers A for live names (and anything under wildcard),
+    NXDOMAIN otherwise; "blackhole" never answers; "servfail" always fails"""
+    socks = []
+
+    def _start(mode="zone", live=(), wildcard=None):
+        sk = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sk.bind(("127.0.0.1", 0))
+        socks.append(sk)
+        seen = []
+        threading.Thread(target=_serve, args=(sk, mode, set(live), wildcard, seen), daemon=True).start()
+        return f"127.0.0.1:{sk.getsockname()[1]}", seen
+
+    yield _start
+    for sk in socks:
+        sk.close()
+
+
+@pytest.fixture(autouse=True)
+def _no_cache(monkeypatch):
+    monkeypatch.setattr(subscan, "DNS_CACHE", None)
+    monkeypatch.setattr(subscan, "_CACHE", None)
+    monkeypatch.setattr(subscan, "DNS_TO", 2)
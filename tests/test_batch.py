@@ -0,0 +1,14 @@
+import subscan
+
+
+def test_resolvers_reach_every_scan(monkeypatch):
+    seen = {}
+
+    def _scan(domain, methods, **kw):
+        seen[domain] = kw.get("resolvers")
+        return {"results": [], "logs": [], "stats": {}}
+
+    monkeypatch.setattr(subscan, "run_scan", _scan)
+    out = dict(subscan.run_batch(["a.example.test", "b.example.test"], ["crtsh"], resolvers=["127.0.0.1:5353"]))
+    assert set(out) == {"a.example.test", "b.example.test"}
+    assert seen == {"a.example.test": ["127.0.0.1:5353"], "b.example.test": ["127.0.0.1:5353"]}
@@ -0,0 +1,43 @@
+import pytest
+
+import cli
+import subscan
+
+
+def test_bad_job_queue_fails(tmp_path, capsys):
+    assert cli.main(["-q", "--jobs", str(tmp_path / "missing" / "jobs.db"), "example.test"]) == cli.FAILED
+
+
+def test_engine_error_fails(monkeypatch, capsys):
+    def _boom(*a, **kw):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(subscan, "run_scan", _boom)
+    assert cli.main(["-q", "example.test"]) == cli.FAILED
+    assert '"error": "boom"' in capsys.readouterr().out
+
+
+def test_missing_list_is_a_usage_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as e:
+        cli.main(["-l", str(tmp_path / "missing.txt")])
+    assert e.value.code == 2
+    assert "can't read" in capsys.readouterr().err
+
+
+def test_unknown_method_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as e:
+        cli.main(["--methods", "crtsh,nosuch", "example.test"])
+    assert e.value.code == 2
+    assert "unknown methods: nosuch" in capsys.readouterr().err
+
+
+def test_every_source_failing_fails(stub, monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(subscan, "SCAN_STORE", None)
+    ns, _ = stub()
+
+    def _down(domain):
+        raise subscan.SourceError("down")
+
+    monkeypatch.setitem(subscan.SOURCES, "down", _down)
+    argv = ["-q", "--methods", "down", "--no-enrich", "--no-probe", "--resolvers", ns, "example.test"]
+    assert cli.main(argv) == cli.FAILED
@@ -0,0 +1,42 @@
+import subscan
+
+ZONE = "wild.example.test"
+
+
+def _use_cache(monkeypatch, tmp_path, **kw):
+    cache = subscan.DnsCache(tmp_path / "cache.db", **kw)
+    monkeypatch.setattr(subscan, "DNS_CACHE", tmp_path / "cache.db")
+    monkeypatch.setattr(subscan, "_CACHE", cache)
+    return cache
+
+
+def test_failed_wildcard_check_isnt_cached(stub, monkeypatch, tmp_path):
+    _use_cache(monkeypatch, tmp_path)
+    dead, _ = stub("blackhole")
+    good, _ = stub(wildcard=ZONE)
+    monkeypatch.setattr(subscan, "DNS_TO", 0.2)
+    assert not subscan.check_wildcard(ZONE, subscan.ResolverPool([dead], qps=0))
+    fp = subscan.check_wildcard(ZONE, subscan.ResolverPool([good], qps=0))
+    assert fp and fp.ips == {"10.0.0.1"}
+    found = subscan.from_bruteforce(ZONE, pool=subscan.ResolverPool([good], qps=0), words=["a", "b", "c"])
+    assert found == []
+
+
+def test_answered_wildcard_check_is_cached(stub, monkeypatch, tmp_path):
+    _use_cache(monkeypatch, tmp_path)
+    good, seen = stub(wildcard=ZONE)
+    pool = subscan.ResolverPool([good], qps=0)
+    subscan.check_wildcard(ZONE, pool)
+    n = len(seen)
+    assert subscan.check_wildcard(ZONE, pool)
+    assert len(seen) == n
+
+
+def test_small_flushes_still_evict(monkeypatch, tmp_path):
+    cache = _use_cache(monkeypatch, tmp_path, max_rows=50)
+    monkeypatch.setattr(subscan, "DNS_CACHE_EVICT", 0)
+    for i in range(20):
+        for j in range(10):
+            cache.put(f"h{i}-{j}.example.test", "A", subscan._record(["10.0.0.1"], ttl=300))
+        cache.flush()
+    assert cache._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0] <= 50
@@ -0,0 +1,92 @@
+import json
+import re
+
+import pytest
+
+import subscan
+
+
+def _fp(*sigs):
+    return subscan.Fingerprints([{"tech": t, "match": m, "in": sc} for t, m, sc in sigs])
+
+
+def _naive(sigs, headers, body):
+    # what the compiled matcher has to agree with: every signature's regex
+    # searched on its own over the text of its scope
+    heads = "\n".join(f"{k}: {v}" for k, v in headers.items() if k.lower() != "set-cookie")
+    cookies = "\n".join(f"{k}: {v}" for k, v in headers.items() if k.lower() == "set-cookie")
+    texts = {"headers": heads, "cookies": cookies, "body": body[:subscan._TECH_WINDOW]}
+    texts["any"] = "\n".join(texts.values())
+    found = []
+    for sig in sigs:
+        if sig["tech"] not in found and re.search(sig["match"], texts[sig.get("in", "any")], re.I):
+            found.append(sig["tech"])
+    order = {}
+    for i, sig in enumerate(sigs):
+        order.setdefault(sig["tech"], i)
+    return sorted(found, key=order.get)
+
+
+def test_prefix_literals_both_match():
+    fp = _fp(("apache", "Apache", "headers"), ("tomcat", "Apache-Coyote", "headers"))
+    assert fp.match({"Server": "Apache-Coyote/1.1"}, "") == ["apache", "tomcat"]
+    assert fp.match({"Server": "Apache/2.4"}, "") == ["apache"]
+
+
+def test_overlapping_literals_both_match():
+    # "bcd" starts inside "abc"
+    fp = _fp(("one", "abc", "body"), ("two", "bcd", "body"), ("three", "cdx", "body"))
+    assert fp.match({}, "xxabcdyy") == ["one", "two"]
+
+
+def test_alternation_splits_into_literals():
+    fp = _fp(("rails", "_rails_session|_session_id", "cookies"))
+    assert fp.match({"Set-Cookie": "_session_id=1"}, "") == ["rails"]
+    assert fp.match({"Set-Cookie": "_rails_session=1"}, "") == ["rails"]
+    assert fp.match({"Set-Cookie": "session=1"}, "") == []
+
+
+def test_regex_pieces():
+    fp = _fp(("wp", r"wp-(content|includes)/", "body"), ("ver", r"nginx/\d+\.\d+|openresty", "headers"),
+             ("dot", r"amazonaws\.com", "body"))
+    assert fp.match({}, '<link href="/wp-includes/x.css">') == ["wp"]
+    assert fp.match({"Server": "nginx/1.25"}, "") == ["ver"]
+    assert fp.match({"Server": "nginx"}, "") == []
+    # an escaped dot is still a literal, and still only matches a dot
+    assert fp.match({}, "s3.amazonaws.com") == ["dot"]
+    assert fp.match({}, "s3.amazonawsXcom") == []
+
+
+def test_scopes_are_kept_apart():
+    fp = _fp(("h", "marker", "headers"), ("c", "marker", "cookies"), ("b", "marker", "body"),
+             ("a", "anywhere", "any"))
+    assert fp.match({"X-Thing": "marker"}, "") == ["h"]
+    assert fp.match({"Set-Cookie": "marker=1"}, "") == ["c"]
+    assert fp.match({}, "<p>marker</p>") == ["b"]
+    assert fp.match({"Set-Cookie": "anywhere=1"}, "") == ["a"]
+    assert fp.match({}, "anywhere") == ["a"]
+
+
+def test_body_past_the_window_is_ignored():
+    fp = _fp(("b", "marker", "body"))
+    assert fp.match({}, "x" * subscan._TECH_WINDOW + "marker") == []
+
+
+def test_fallback_table(tmp_path):
+    fp = subscan.Fingerprints.load(tmp_path / "missing.json")
+    assert set(fp.order) == set(subscan._TECH)
+    assert fp.match({"Server": "Apache-Coyote/1.1"}, "") == ["apache", "tomcat"]
+    assert fp.match({}, '<script src="/_next/static/x.js">') == ["react"]
+
+
+@pytest.mark.parametrize("headers,body", [
+    ({"Server": "nginx", "Via": "1.1 varnish, Fastly"}, "<title>x</title>"),
+    ({"Server": "cloudflare", "CF-RAY": "1", "Set-Cookie": "XSRF-TOKEN=1, laravel_session=2"}, ""),
+    ({"Server": "Microsoft-IIS/10.0", "Set-Cookie": "csrftoken=1"}, "wp-content wordpress"),
+    ({"X-Amz-Cf-Id": "CloudFront", "Link": "<https://x/wp-json/>"}, "bucket.s3.amazonaws.com __next"),
+    ({"Server": "Apache-Coyote/1.1", "Set-Cookie": "_rails_session=1"}, "data-reactroot"),
+    ({"X-Note": "nothing here"}, "plain page " * 500),
+])
+def test_agrees_with_a_naive_matcher(headers, body):
+    sigs = json.loads(subscan.FINGERPRINTS.read_text(encoding="utf-8"))
+    assert subscan.Fingerprints(sigs).match(headers, body) == _naive(sigs, headers, body)
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+import subscan
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "JOB_POLL", 0.01)
+    return subscan.JobQueue(tmp_path / "jobs.db")
+
+
+def test_claim_hands_out_each_job_once(queue):
+    queue.submit("brute", {"n": 1})
+    job_id, kind, payload = queue.claim()
+    assert (kind, payload) == ("brute", {"n": 1})
+    assert queue.claim() is None
+
+
+def test_expired_lease_is_handed_out_again(queue, monkeypatch):
+    monkeypatch.setattr(subscan, "JOB_LEASE", -1)
+    queue.submit("brute", {"n": 1})
+    first = queue.claim()
+    assert queue.claim()[0] == first[0]
+
+
+def test_finished_result_reaches_the_coordinator(queue):
+    fut = queue.submit("brute", {"n": 1})
+    job_id, _, _ = queue.claim()
+    queue.finish(job_id, {"found": ["a.example.test"]})
+    assert fut.result(timeout=5) == {"found": ["a.example.test"]}
+
+
+def test_failed_job_is_retried_then_given_up(queue, monkeypatch):
+    monkeypatch.setattr(subscan, "JOB_LEASE", -1)
+    fut = queue.submit("brute", {"n": 1})
+    ids = [queue.claim()[0] for _ in range(subscan.JOB_TRIES)]
+    assert len(set(ids)) == 1
+    assert queue.claim() is None
+    with pytest.raises(RuntimeError, match=f"gave up after {subscan.JOB_TRIES} tries"):
+        fut.result(timeout=5)
+
+
+def test_finish_from_an_expired_lease_still_counts(queue, monkeypatch):
+    monkeypatch.setattr(subscan, "JOB_LEASE", -1)
+    fut = queue.submit("brute", {"n": 1})
+    first, _, _ = queue.claim()
+    queue.claim()
+    queue.finish(first, {"found": []})
+    assert fut.result(timeout=5) == {"found": []}
+
+
+def test_new_queue_only_purges_old_finished_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "JOB_POLL", 0.01)
+    path = tmp_path / "jobs.db"
+    coord = subscan.JobQueue(path)
+    fut = coord.submit("brute", {"n": 1})
+    old = time.time() - subscan.JOB_KEEP - 60
+    coord._db.execute("UPDATE jobs SET created = ?", (old,))
+    coord._db.execute(
+        "INSERT INTO jobs (owner, kind, payload, state, tries, created, result) "
+        "VALUES ('gone', 'brute', '{}', 'done', 1, ?, '{}')", (old,)
+    )
+    worker = subscan.JobQueue(path)
+    assert [r[0] for r in worker._db.execute("SELECT owner FROM jobs")] == [coord.owner]
+    job_id, _, _ = worker.claim()
+    worker.finish(job_id, {"found": []})
+    assert fut.result(timeout=5) == {"found": []}
+
+
+def test_vanished_job_fails_its_waiter(queue):
+    fut = queue.submit("brute", {"n": 1})
+    queue._db.execute("DELETE FROM jobs")
+    with pytest.raises(RuntimeError, match="vanished"):
+        fut.result(timeout=10)
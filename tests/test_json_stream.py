@@ -0,0 +1,121 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+import subscan
+
+# strings with escapes and brackets, numbers that end right at a boundary,
+# multi-byte utf-8, and non-target keys holding every kind of value
+DOC = {
+    "skip_str": "a \"quoted\" ] } , [ {",
+    "skip_num": -12.5e3,
+    "skip_obj": {"data": [1, 2], "nested": {"x": [{"y": "]"}]}},
+    "data": [
+        {"id": "www.example.test", "n": 12345},
+        {"id": "café.example.test", "n": 0.25},
+        {"id": "日本.example.test", "n": -7},
+        {"id": "\U0001f600.example.test", "n": 1e-3},
+        "plain \\ backslash",
+        98765,
+    ],
+    "skip_after": [None, True, False],
+    "other": [{"id": "b.example.test"}],
+}
+RAW = json.dumps(DOC, ensure_ascii=False).encode("utf-8")
+
+
+def _items(raw, *keys, size=None, cuts=()):
+    if size:
+        chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+    else:
+        bounds = [0, *cuts, len(raw)]
+        chunks = [raw[a:b] for a, b in zip(bounds, bounds[1:])]
+    return list(subscan.json_items(chunks, *keys))
+
+
+def test_every_split_point():
+    want = [("data", item) for item in DOC["data"]]
+    for cut in range(1, len(RAW)):
+        assert _items(RAW, "data", cuts=(cut,)) == want, cut
+
+
+def test_byte_at_a_time():
+    want = [("data", item) for item in DOC["data"]] + [("other", item) for item in DOC["other"]]
+    assert _items(RAW, "data", "other", size=1) == want
+
+
+def test_number_split_across_chunks():
+    raw = b'{"data": [12345, 0.125, -6e10]}'
+    for cut in range(raw.index(b"1"), len(raw)):
+        assert _items(raw, "data", cuts=(cut,)) == [("data", 12345), ("data", 0.125), ("data", -6e10)]
+
+
+def test_non_target_keys_are_skipped():
+    assert _items(RAW, "other", size=7) == [("other", {"id": "b.example.test"})]
+    assert _items(RAW, "missing", size=7) == []
+
+
+def test_top_level_array():
+    raw = json.dumps(DOC["data"], ensure_ascii=False).encode()
+    assert _items(raw, size=3) == [(None, item) for item in DOC["data"]]
+    assert _items(b"[]", size=1) == []
+
+
+def test_bad_utf8_is_replaced():
+    assert _items(b'["a\xffb"]') == [(None, "a�b")]
+
+
+@pytest.mark.parametrize("raw", [
+    b'{"data": [1, 2',
+    b'{"data": [{"id": "www.exa',
+    b'{"data": [1, 2,',
+    b'{"skip": "abc',
+    b'[1, 2',
+    b'',
+])
+def test_truncated_stream_raises(raw):
+    with pytest.raises(ValueError):
+        _items(raw, *(["data"] if raw.startswith(b"{") else []), size=4)
+
+
+def test_truncation_never_yields_garbage():
+    want = [("data", item) for item in DOC["data"]]
+    end = RAW.index(b'"skip_after"')
+    for n in range(end):
+        try:
+            got = _items(RAW[:n], "data", size=5)
+        except ValueError:
+            continue
+        assert got == want[:len(got)], n
+
+
+@pytest.fixture
+def json_server():
+    class _Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            status = 500 if self.path == "/broken" else 200
+            body = b'{"error": "nope"}' if status != 200 else RAW
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+def test_get_json_streams_from_a_server(json_server):
+    got = list(subscan._get_json(json_server + "/ok", "other"))
+    assert got == [("other", {"id": "b.example.test"})]
+
+
+def test_get_json_non_200_is_a_source_error(json_server):
+    with pytest.raises(subscan.SourceError, match="500"):
+        list(subscan._get_json(json_server + "/broken", "data"))
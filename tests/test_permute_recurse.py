@@ -0,0 +1,90 @@
+import subscan
+
+D = "example.test"
+
+
+def test_permutations_budget_cuts_off_in_order():
+    names = [f"dev-api2.{D}", f"mail.{D}", f"eu.corp.{D}"]
+    full = subscan.permutations(names, D, 5000)
+    assert len(full) > 100
+    assert subscan.permutations(names, D, 100) == full[:100]
+    assert subscan.permutations(names, D, 0) == []
+
+
+def test_permutations_skip_known_names_and_repeats():
+    names = [f"dev-api2.{D}", f"dev-api3.{D}", f"api2-dev.{D}", f"staging-api2.{D}", "dev.other.test"]
+    cands = subscan.permutations(names, D, 5000)
+    assert len(cands) == len(set(cands))
+    assert not {f"{c}.{D}" for c in cands} & set(names)
+    # the kinds of mutation all show up for dev-api2
+    assert {"dev-api1", "qa-api2", "dev-qa", "dev-api2-qa", "qa.dev-api2"} <= set(cands)
+    # names under another domain aren't mutated
+    assert not any("other" in c for c in cands)
+
+
+def _zone(hosts):
+    """fake brute(labels, level) over a zone holding hosts: a host answers,
+    a name with hosts below it answers NOERROR-empty (goes into level),
+    anything else is NXDOMAIN. queried collects every label asked for"""
+    queried = []
+
+    def brute(labels, level):
+        hits = []
+        for label in labels:
+            queried.append(label)
+            fqdn = f"{label}.{D}"
+            if fqdn in hosts:
+                hits.append(fqdn)
+            elif any(h.endswith("." + fqdn) for h in hosts):
+                level.add(fqdn)
+        return hits
+
+    return brute, queried
+
+
+def _zones_tried(queried):
+    return {q.split(".", 1)[1] for q in queried}
+
+
+def test_recurse_digs_through_empty_non_terminals():
+    # corp has nothing of its own, only eu.corp has hosts below it
+    hosts = {f"www.{D}", f"a.eu.corp.{D}"}
+    brute, queried = _zone(hosts)
+    found = subscan.recurse(D, [f"www.{D}"], {f"corp.{D}"}, brute, ["eu", "a", "x"], depth=3)
+    assert found == [f"a.eu.corp.{D}"]
+    # hosts found along the way get their turn too
+    assert _zones_tried(queried) == {"corp", "www", "eu.corp", "a.eu.corp"}
+
+
+def test_recurse_skips_nxdomain_subtrees():
+    hosts = {f"www.{D}", f"a.eu.corp.{D}"}
+    brute, queried = _zone(hosts)
+    subscan.recurse(D, [f"www.{D}"], {f"corp.{D}"}, brute, ["eu", "a", "x", "y"], depth=4)
+    nx = {q for q in queried if f"{q}.{D}" not in hosts and not any(h.endswith(f".{q}.{D}") for h in hosts)}
+    assert {"x.corp", "a.corp", "x.www"} <= nx
+    assert not _zones_tried(queried) & nx
+
+
+def test_recurse_stops_at_depth():
+    hosts = {f"www.{D}", f"a.eu.corp.{D}"}
+    brute, queried = _zone(hosts)
+    found = subscan.recurse(D, [f"www.{D}"], {f"corp.{D}"}, brute, ["eu", "a"], depth=1)
+    assert found == []
+    assert _zones_tried(queried) == {"corp", "www"}
+
+
+def test_recurse_budget_goes_to_non_terminals_first():
+    hosts = {f"www.{D}", f"a.eu.corp.{D}"}
+    brute, queried = _zone(hosts)
+    words = ["eu", "a", "x"]
+    subscan.recurse(D, [f"www.{D}"], {f"corp.{D}"}, brute, words, depth=3, budget=len(words))
+    assert len(queried) == len(words)
+    assert _zones_tried(queried) == {"corp"}
+    assert subscan.recurse(D, [f"www.{D}"], (), brute, words, budget=len(words) - 1) == []
+
+
+def test_recurse_only_returns_new_hosts():
+    hosts = {f"www.{D}", f"a.www.{D}", f"b.www.{D}"}
+    brute, _ = _zone(hosts)
+    found = subscan.recurse(D, [f"www.{D}", f"a.www.{D}"], (), brute, ["a", "b"], depth=2)
+    assert found == [f"b.www.{D}"]
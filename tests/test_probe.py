@@ -0,0 +1,133 @@
+import http.server
+import socket
+import threading
+import time
+
+import pytest
+
+import subscan
+
+
+@pytest.fixture
+def silent_port():
+    # accepts connections and never says anything
+    sk = socket.socket()
+    sk.bind(("127.0.0.1", 0))
+    sk.listen(64)
+    yield sk.getsockname()[1]
+    sk.close()
+
+
+def _web_server(title):
+    class _Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            # /pad/<n> adds n bytes after the title
+            pad = int(self.path.split("/")[2]) if self.path.startswith("/pad/") else 0
+            body = b"<title>%s</title>" % title + b"a" * pad
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            if self.path == "/charset":
+                self.send_header("Content-Type", "text/html; charset=utf-9x")
+            if self.path == "/cookies":
+                self.send_header("Set-Cookie", "lang=en")
+                self.send_header("Set-Cookie", "_rails_session=abc")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+@pytest.fixture
+def web_port():
+    srv = _web_server(b"ok")
+    yield srv.server_address[1]
+    srv.shutdown()
+
+
+def _feed(hosts, delay=0.0):
+    hosts = iter(hosts)
+
+    def _next():
+        time.sleep(delay)
+        return next(hosts, None)
+    return _next
+
+
+def test_deadline_starts_at_first_host(web_port):
+    # hosts that take longer to show up than the whole deadline still get probed
+    out = {}
+    addrs = {"a.example.test": ["127.0.0.1"]}
+    subscan.asyncio.run(subscan.probe_stream(_feed(addrs, delay=1.5), out.__setitem__, addrs,
+                                             deadline=1, ports=[web_port]))
+    res = out["a.example.test"]
+    assert res["alive"] and res["title"] == "ok" and not res.get("skipped")
+
+
+def test_deadline_marks_hosts_skipped(silent_port):
+    out = {}
+    addrs = {"a.example.test": ["127.0.0.1"]}
+    subscan.asyncio.run(subscan.probe_stream(_feed(addrs), out.__setitem__, addrs,
+                                             deadline=0.5, ports=[silent_port]))
+    res = out["a.example.test"]
+    assert res["skipped"] and not res["alive"]
+    assert subscan.build_row("example.test", "a.example.test", {"brute"}, {}, res)["probe_skipped"]
+
+
+def test_every_open_web_port_is_probed(web_port, silent_port, monkeypatch):
+    monkeypatch.setattr(subscan, "HTTP_TO", 2)
+    other = _web_server(b"admin")
+    out = {}
+    addrs = {"a.example.test": ["127.0.0.1"]}
+    ports = [web_port, other.server_address[1], silent_port]
+    try:
+        subscan.asyncio.run(subscan.probe_stream(_feed(addrs), out.__setitem__, addrs, ports=ports))
+    finally:
+        other.shutdown()
+    res = out["a.example.test"]
+    assert res["alive"] and res["ports"] == sorted(ports)
+    assert sorted(w["title"] for w in res["web"]) == ["admin", "ok"]
+
+
+def test_standard_ports_are_tried_first():
+    assert subscan._web_targets("a.test", [80, 443, 8080]) == [
+        ("a.test", ("https", "http")), ("a.test:8080", ("https", "http"))]
+    assert subscan._web_targets("a.test", []) == []
+
+
+@pytest.mark.parametrize("pad,truncated", [(4000, False), (200000, True)])
+def test_truncated_only_when_body_left(web_port, pad, truncated):
+    host = f"127.0.0.1:{web_port}/pad/{pad}"
+    assert subscan.http_probe(host, schemes=("http",))["truncated"] is truncated
+
+    async def _async():
+        async with subscan._probe_session({}) as session:
+            return await subscan.http_probe_async(session, host, schemes=("http",))
+    res = subscan.asyncio.run(_async())
+    assert res["alive"] and res["truncated"] is truncated
+
+
+def test_unknown_charset_still_alive(web_port):
+    host = f"127.0.0.1:{web_port}/charset"
+    res = subscan.http_probe(host, schemes=("http",))
+    assert res["alive"] and res["title"] == "ok"
+
+    async def _async():
+        async with subscan._probe_session({}) as session:
+            return await subscan.http_probe_async(session, host, schemes=("http",))
+    res = subscan.asyncio.run(_async())
+    assert res["alive"] and res["title"] == "ok"
+
+
+def test_every_set_cookie_reaches_the_matcher(web_port):
+    host = f"127.0.0.1:{web_port}/cookies"
+    assert "rails" in subscan.http_probe(host, schemes=("http",))["tech"]
+
+    async def _async():
+        async with subscan._probe_session({}) as session:
+            return await subscan.http_probe_async(session, host, schemes=("http",))
+    assert "rails" in subscan.asyncio.run(_async())["tech"]
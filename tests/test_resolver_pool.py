@@ -0,0 +1,58 @@
+# resolver pool against stub dns servers on localhost: a zone that answers,
+# one that never does and one that SERVFAILs everything
+
+import pytest
+
+import subscan
+
+ZONE = "example.test"
+WORDS = [f"w{i}" for i in range(1000)]
+
+
+def test_spreads_over_upstreams(stub):
+    live = {f"{w}.{ZONE}" for w in WORDS[::5]}
+    a, seen_a = stub(live=live)
+    b, seen_b = stub(live=live)
+    pool = subscan.ResolverPool([a, b], qps=0)
+    found = subscan.from_bruteforce(ZONE, subscan.Wildcard(ZONE), pool=pool, words=WORDS, inflight=100)
+    assert len(found) == len(live)
+    assert seen_a and seen_b
+
+
+@pytest.mark.parametrize("mode", ["blackhole", "servfail"])
+def test_fails_over_from_sick_upstream(stub, mode):
+    live = {f"{w}.{ZONE}" for w in WORDS[::5]}
+    good, _ = stub(live=live)
+    sick, _ = stub(mode)
+    pool = subscan.ResolverPool([good, sick], qps=0)
+    found = subscan.from_bruteforce(ZONE, subscan.Wildcard(ZONE), pool=pool, words=WORDS, inflight=100)
+    assert len(found) == len(live)
+    down = {s["resolver"]: s["down"] for s in pool.stats()}
+    assert down[sick] and not down[good]
+
+
+def test_sync_resolve_fails_over(stub):
+    good, _ = stub(live={f"www.{ZONE}"})
+    sick, _ = stub("blackhole")
+    pool = subscan.ResolverPool([sick, good], qps=0)
+    for _ in range(5):
+        assert subscan.resolve(f"www.{ZONE}", "A", pool)["values"] == ["10.0.0.1"]
+
+
+def test_gives_up_after_retries(stub):
+    sick, seen = stub("servfail")
+    pool = subscan.ResolverPool([sick], qps=0)
+    with pytest.raises(Exception):
+        subscan.resolve(f"www.{ZONE}", "A", pool)
+    assert len(seen) == subscan.DNS_RETRIES + 1
+
+
+def test_qps_cap(stub):
+    a, _ = stub()
+    pool = subscan.ResolverPool([a], qps=10)
+    taken = 0
+    while pool.try_take()[0]:
+        taken += 1
+    assert taken == 10
+    up, wait = pool.try_take()
+    assert up is None and 0 < wait <= 0.1
@@ -0,0 +1,82 @@
+import subscan
+
+
+def test_empty_rescan_reports_removed(stub, monkeypatch, tmp_path):
+    monkeypatch.setattr(subscan, "SCAN_STORE", tmp_path / "scans.db")
+    monkeypatch.setattr(subscan, "_STORE", None)
+    ns, _ = stub()
+    names = ["a.example.test", "b.example.test"]
+    monkeypatch.setitem(subscan.SOURCES, "fake", lambda d: list(names))
+    kw = {"enrich": False, "probe": False, "resolvers": [ns]}
+
+    first = subscan.run_scan("example.test", ["fake"], **kw)
+    assert first["stats"]["total"] == 2 and "diff" not in first
+    names.clear()
+    second = subscan.run_scan("example.test", ["fake"], **kw)
+    assert second["stats"]["total"] == 0
+    assert second["diff"]["removed"] == ["a.example.test", "b.example.test"]
+    assert subscan.get_store().load("example.test") == {}
+
+
+def test_rows_are_paged(tmp_path):
+    store = subscan.ScanStore(tmp_path / "scans.db")
+    store.save("example.test", [(f"h{i:02}.example.test", 0, 0, {"subdomain": f"h{i:02}.example.test"})
+                                for i in range(25)], {})
+    pages = [store.rows("example.test", off, 10) for off in (0, 10, 20)]
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert [r["subdomain"] for p in pages for r in p] == sorted(f"h{i:02}.example.test" for i in range(25))
+
+
+def _store(monkeypatch, tmp_path):
+    monkeypatch.setattr(subscan, "SCAN_STORE", tmp_path / "scans.db")
+    monkeypatch.setattr(subscan, "_STORE", None)
+    return subscan.get_store()
+
+
+def _down(domain):
+    raise subscan.SourceError("down")
+
+
+def test_failed_sources_keep_the_last_scan(stub, monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    ns, _ = stub()
+    monkeypatch.setitem(subscan.SOURCES, "fake", lambda d: ["a.example.test"])
+    monkeypatch.setitem(subscan.SOURCES, "down", _down)
+    kw = {"enrich": False, "probe": False, "resolvers": [ns]}
+    subscan.run_scan("example.test", ["fake"], **kw)
+
+    data = subscan.run_scan("example.test", ["down"], **kw)
+    assert data["stats"]["sources_failed"] == ["down"]
+    assert "diff" not in data and not data["stats"].get("saved")
+    assert list(store.load("example.test")) == ["a.example.test"]
+
+
+def test_removed_only_by_a_source_that_looked(stub, monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    ns, _ = stub()
+    monkeypatch.setitem(subscan.SOURCES, "one", lambda d: ["a.example.test"])
+    monkeypatch.setitem(subscan.SOURCES, "two", lambda d: ["b.example.test"])
+    kw = {"enrich": False, "probe": False, "resolvers": [ns]}
+    subscan.run_scan("example.test", ["one", "two"], **kw)
+
+    monkeypatch.setitem(subscan.SOURCES, "one", _down)
+    monkeypatch.setitem(subscan.SOURCES, "two", lambda d: [])
+    data = subscan.run_scan("example.test", ["one", "two"], **kw)
+    assert data["diff"]["removed"] == ["b.example.test"]
+    assert list(store.load("example.test")) == ["a.example.test"]
+
+
+def test_fields_not_collected_are_not_changes(stub, monkeypatch, tmp_path):
+    store = _store(monkeypatch, tmp_path)
+    ns, _ = stub()
+    sub = "a.example.test"
+    old = subscan.build_row("example.test", sub, {"fake"}, {"A": ["192.0.2.1"]},
+                            {"alive": True, "status": 200, "title": "home"})
+    store.save("example.test", [(sub, 1.0, 1.0, old)], {})
+    monkeypatch.setitem(subscan.SOURCES, "fake", lambda d: [sub])
+
+    data = subscan.run_scan("example.test", ["fake"], enrich=False, probe=False, resolvers=[ns])
+    assert data["diff"]["changed"] == []
+    dns_at, http_at, row = store.load("example.test")[sub]
+    assert (dns_at, http_at) == (1.0, 1.0)
+    assert row["ip"] == ["192.0.2.1"] and row["status"] == 200 and row["title"] == "home"
@@ -0,0 +1,148 @@
+import socket
+import struct
+import threading
+import time
+
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rrset
+import pytest
+
+import subscan
+
+
+def _answer(q, ip="10.0.0.1"):
+    r = dns.message.make_response(q)
+    name = q.question[0].name.to_text()
+    r.answer.append(dns.rrset.from_text(name, 300, "IN", "A", ip))
+    return r
+
+
+@pytest.fixture
+def server():
+    """server(reply, tcp=None) -> ("127.0.0.1:port", times queries came in)
+
+    reply(query, n) returns the messages to send back for the nth query
+    (0-based) of that name; tcp(query), if given, answers over tcp on the
+    same port"""
+    socks = []
+
+    def _start(reply, tcp=None):
+        t = socket.socket()
+        t.bind(("127.0.0.1", 0))
+        port = t.getsockname()[1]
+        u = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        u.bind(("127.0.0.1", port))
+        socks.extend([t, u])
+        seen, counts = [], {}
+
+        def _udp():
+            while True:
+                try:
+                    data, addr = u.recvfrom(4096)
+                except OSError:
+                    return
+                seen.append(time.monotonic())
+                q = dns.message.from_wire(data)
+                name = q.question[0].name.to_text()
+                n = counts[name] = counts.get(name, -1) + 1
+                for msg in reply(q, n):
+                    u.sendto(msg.to_wire(), addr)
+
+        def _tcp():
+            t.listen(8)
+            while True:
+                try:
+                    c, _ = t.accept()
+                except OSError:
+                    return
+                with c:
+                    size = struct.unpack("!H", c.recv(2))[0]
+                    q = dns.message.from_wire(c.recv(size))
+                    wire = tcp(q).to_wire()
+                    c.sendall(struct.pack("!H", len(wire)) + wire)
+
+        threading.Thread(target=_udp, daemon=True).start()
+        if tcp:
+            threading.Thread(target=_tcp, daemon=True).start()
+        return f"127.0.0.1:{port}", seen
+
+    yield _start
+    for sk in socks:
+        sk.close()
+
+
+def _resolve(ns, names, qps=0, **kw):
+    kw.setdefault("timeout", 0.5)
+    res = subscan.UdpBatchResolver(subscan.ResolverPool([ns], qps=qps), sockets=2, **kw)
+    return {name: rec for name, _, rec in res.resolve_many((n, "A") for n in names)}
+
+
+def test_answers_every_query(server):
+    ns, _ = server(lambda q, n: [_answer(q)])
+    names = [f"h{i}.example.test" for i in range(300)]
+    got = _resolve(ns, names)
+    assert set(got) == set(names)
+    assert all(rec["values"] == ["10.0.0.1"] for rec in got.values())
+
+
+def test_ignores_answers_that_dont_match(server):
+    # a reply with the wrong id, then one for another question, then the real one
+    def _reply(q, n):
+        wrong_id = _answer(q, "10.6.6.6")
+        wrong_id.id = (q.id + 1) & 0xFFFF
+        other = _answer(dns.message.make_query("evil.example.test", "A", id=q.id), "10.6.6.7")
+        other.id = q.id
+        return [wrong_id, other, _answer(q)]
+
+    ns, _ = server(_reply)
+    assert _resolve(ns, ["a.example.test"])["a.example.test"]["values"] == ["10.0.0.1"]
+
+
+def test_retries_after_a_timeout(server):
+    # the first query of every name goes unanswered
+    ns, seen = server(lambda q, n: [_answer(q)] if n else [])
+    got = _resolve(ns, ["a.example.test", "b.example.test"], timeout=0.3)
+    assert all(rec["values"] == ["10.0.0.1"] for rec in got.values())
+    assert len(seen) == 4
+
+
+def test_gives_up_after_retries(server):
+    ns, seen = server(lambda q, n: [])
+    got = _resolve(ns, ["a.example.test"], timeout=0.2, retries=2)
+    assert got == {"a.example.test": None}
+    assert len(seen) == 3
+
+
+def test_nxdomain_is_an_answer(server):
+    def _nx(q, n):
+        r = dns.message.make_response(q)
+        r.set_rcode(dns.rcode.NXDOMAIN)
+        return [r]
+
+    ns, seen = server(_nx)
+    rec = _resolve(ns, ["a.example.test"])["a.example.test"]
+    assert rec["values"] == [] and rec.get("nx") and len(seen) == 1
+
+
+def test_truncated_answer_falls_back_to_tcp(server):
+    def _tc(q, n):
+        r = dns.message.make_response(q)
+        r.flags |= dns.flags.TC
+        return [r]
+
+    ns, _ = server(_tc, tcp=lambda q: _answer(q, "10.0.0.2"))
+    assert _resolve(ns, ["a.example.test"])["a.example.test"]["values"] == ["10.0.0.2"]
+
+
+def test_sends_stay_under_the_qps_cap(server):
+    qps, n = 20, 60
+    ns, seen = server(lambda q, i: [_answer(q)])
+    got = _resolve(ns, [f"h{i}.example.test" for i in range(n)], qps=qps)
+    assert len(got) == n
+    t0 = seen[0]
+    # a full bucket up front, then qps a second
+    for k, t in enumerate(seen, 1):
+        assert k <= qps + (t - t0) * qps + 2
+    assert seen[-1] - t0 >= (n - qps) / qps * 0.9
@@ -0,0 +1,108 @@
+import struct
+import sys
+
+import pytest
+
+import subscan
+
+
+def test_membership_uses_the_index(tmp_path):
+    src = tmp_path / "words.txt"
+    src.write_text("www\nMail\n\nbad_label!\nwww\napi\n")
+    wl = subscan.Wordlist(subscan.compile_wordlist(src, tmp_path / "words.wl"))
+    assert list(wl) == ["www", "mail", "api"]
+    assert "api" in wl and "mail" in wl
+    assert "dev" not in wl and "bad_label!" not in wl
+
+
+def test_older_format_is_recompiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "_WORDLISTS", {})
+    src = tmp_path / "words.txt"
+    src.write_text("www\napi\n")
+    st = src.stat()
+    old = struct.pack("<8sQQQ", b"SUBSCNWL", 2, st.st_size, st.st_mtime_ns) + b"www\napi\n"
+    (tmp_path / "words.txt.wl").write_bytes(old)
+    wl = subscan.load_wordlist(src)
+    assert wl.path == tmp_path / "words.txt.wl"
+    assert list(wl) == ["www", "api"] and "api" in wl
+
+
+def test_rank_words_does_not_walk_the_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "SCAN_STORE", tmp_path / "scans.db")
+    monkeypatch.setattr(subscan, "_STORE", None)
+    store = subscan.get_store()
+    for domain in ("a.test", "b.test"):
+        store.save(domain, [(f"{lb}.{domain}", 0, 0, {}) for lb in ("api", "vpn")], {})
+    src = tmp_path / "words.txt"
+    src.write_text("www\nmail\napi\n")
+    wl = subscan.Wordlist(subscan.compile_wordlist(src, tmp_path / "words.wl"))
+
+    def _walk(self):
+        raise AssertionError("walked the wordlist")
+    monkeypatch.setattr(subscan.Wordlist, "__iter__", _walk)
+    ranked = subscan.rank_words(wl)
+    # vpn was learned but isn't in the list, so it isn't added
+    assert ranked.top == ["api"]
+
+
+def test_named_wordlist_errors_are_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "_WORDLISTS", {})
+    missing = tmp_path / "missing.txt"
+    with pytest.raises(OSError):
+        subscan._load_words(missing)
+    data = subscan.run_scan("example.test", ["brute"], enrich=False, probe=False,
+                            resolvers=["127.0.0.1:9"], wordlist=str(missing))
+    assert data["error"].startswith("can't load wordlist")
+
+
+def test_zst_without_zstandard_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "_WORDLISTS", {})
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    src = tmp_path / "words.txt.zst"
+    src.write_bytes(b"\x28\xb5\x2f\xfd")
+    with pytest.raises(RuntimeError, match="zstandard"):
+        subscan._load_words(src)
+
+
+def test_default_wordlist_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "_WORDLISTS", {})
+    monkeypatch.setattr(subscan, "WORDLIST", tmp_path / "missing.txt")
+    assert subscan._load_words() is subscan._DEFAULT_WORDS
+
+
+def test_brute_record_beats_popularity(tmp_path):
+    store = subscan.ScanStore(tmp_path / "scans.db")
+    for domain in ("a.test", "b.test", "c.test"):
+        store.save(domain, [(f"{lb}.{domain}", 0, 0, {}) for lb in ("api", "vpn", "www")], {})
+    # www is everywhere but brute-force never finds it, api always does
+    for _ in range(10):
+        store.record_brute(["www", "api"], ["api"])
+    scores = dict(store.label_scores())
+    assert [lb for lb, _ in store.label_scores()] == ["api", "vpn", "www"]
+    assert scores["vpn"] == 1.0     # nothing tried yet, all prior
+    assert scores["www"] == pytest.approx(5 / 15)
+
+
+def test_ranked_words_know_what_was_tried():
+    ranked = subscan.RankedWords(["a", "b", "c", "d"], ["c", "a"], limit=1)
+    assert list(ranked) == ["c"] and ranked.tried() == ["c"]
+    ranked.limit = 0
+    assert list(ranked) == ["c", "a", "b", "d"] and ranked.tried() == ["c", "a"]
+
+
+def test_brute_runs_are_recorded(stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(subscan, "SCAN_STORE", tmp_path / "scans.db")
+    monkeypatch.setattr(subscan, "_STORE", None)
+    monkeypatch.setattr(subscan, "_WORDLISTS", {})
+    store = subscan.get_store()
+    for domain in ("a.test", "b.test"):
+        store.save(domain, [(f"{lb}.{domain}", 0, 0, {}) for lb in ("www", "api")], {})
+    src = tmp_path / "words.txt"
+    src.write_text("mail\nwww\napi\ndev\n")
+    ns, _ = stub(live=["api.example.test", "dev.example.test"])
+
+    subscan.run_scan("example.test", ["brute"], enrich=False, probe=False, resolvers=[ns],
+                     wordlist=str(src), brute_budget=3)
+    rows = dict(((lb, (t, h)) for lb, t, h in store._db.execute("SELECT label, tries, hits FROM brute")))
+    # both learned labels were tried, and api hit; dev was past the budget
+    assert rows == {"www": (1, 0), "api": (1, 1)}